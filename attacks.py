@@ -0,0 +1,197 @@
+"""
+This file contains the attack tables.
+
+The squares a knight, king or pawn attacks only depend on the square it stands on,
+so they are computed once at import and looked up during move generation.
+Rooks, bishops and queens use magic bitboards: the occupancy of the squares that can
+block a slider is multiplied by a magic number, and the top bits of the product index
+a table of attack sets, built for each square the first time it is needed.
+Square index is rank*8 + file, so a8 is 0 and h1 is 63
+"""
+
+def _leaper_table(offsets):
+    """Returns the attack set of a piece that jumps by offsets, for every square"""
+    table = []
+    for square in range(64):
+        file, rank = square & 7, square >> 3
+        attacks = 0
+        for (dfile, drank) in offsets:
+            if 0 <= file+dfile < 8 and 0 <= rank+drank < 8:
+                attacks |= 1 << ((rank+drank)*8 + file+dfile)
+        table.append(attacks)
+    return table
+
+
+# Attack sets, one bit per square
+KNIGHT_ATTACKS = _leaper_table(((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)))
+KING_ATTACKS = _leaper_table(((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)))
+# indexed by colour, white pawns move towards rank 0 and black pawns towards rank 7
+PAWN_ATTACKS = (_leaper_table(((-1, -1), (1, -1))), _leaper_table(((-1, 1), (1, 1))))
+
+# Castling rights
+WHITE_KING_SIDE = 1
+WHITE_QUEEN_SIDE = 2
+BLACK_KING_SIDE = 4
+BLACK_QUEEN_SIDE = 8
+
+# castling rights that survive a move from or to each square
+CASTLE_MASK = [15] * 64
+CASTLE_MASK[60] = 15 & ~(WHITE_KING_SIDE | WHITE_QUEEN_SIDE)
+CASTLE_MASK[63] = 15 & ~WHITE_KING_SIDE
+CASTLE_MASK[56] = 15 & ~WHITE_QUEEN_SIDE
+CASTLE_MASK[4] = 15 & ~(BLACK_KING_SIDE | BLACK_QUEEN_SIDE)
+CASTLE_MASK[7] = 15 & ~BLACK_KING_SIDE
+CASTLE_MASK[0] = 15 & ~BLACK_QUEEN_SIDE
+
+
+# Sliding directions as (file, rank) steps
+ROOK_DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+BISHOP_DIRECTIONS = ((-1, -1), (1, -1), (-1, 1), (1, 1))
+
+# Magic numbers found offline for this square layout, one per square
+ROOK_MAGICS = (
+    0x0480048661400110, 0x0240001000a00142, 0x4100084020010012, 0x0080080080049000,
+    0x0200142010020018, 0x01002100081c0002, 0x0080008003000200, 0x0200084401608201,
+    0x0000800068824000, 0x0000804000200581, 0x3000801005806000, 0x1080803000802800,
+    0x0000800400180280, 0x240a001542002810, 0x4c03008200210004, 0x0002800100014280,
+    0x8000808012a04000, 0xc240404000201000, 0x0000820040220010, 0x000a020010200840,
+    0x0000808008008400, 0x8021010002a40028, 0x0001040011180210, 0x8000060000840051,
+    0x8401942080024004, 0x0010004440022002, 0x0000100080200080, 0x4200100100210118,
+    0x0042002200120832, 0x0901001b00180400, 0x0021120080800100, 0x4801000100008442,
+    0x2502400920800090, 0x0000802101004005, 0x0030100088802002, 0x8002801000800800,
+    0x3800811800800c00, 0x00c24c0080800200, 0x2002422304000810, 0x0004014482000124,
+    0x00c0008020538001, 0x0170002002404000, 0x0000200010008080, 0x00020020c00a0030,
+    0x0404008158008004, 0x4010220004008080, 0x0030084a01140010, 0x0001000040910002,
+    0x400102a488460200, 0x6114400020048880, 0x1001950040a00100, 0x0008008010000880,
+    0x9402000810942200, 0x08220008100c0200, 0x0001000200341100, 0xa410008c00490200,
+    0x8404422011008001, 0xa0a0400011008021, 0x0009001243200029, 0x0000209000452901,
+    0x000200448890200a, 0x0002000408131002, 0x0102100e0508009c, 0x1020010400a08042,
+)
+BISHOP_MAGICS = (
+    0x0084208802448180, 0x0c302200910a0800, 0x040880810a000000, 0x00341042102c0004,
+    0x0124046088009201, 0x100490100880a041, 0x0402008404404920, 0x1430808048204c01,
+    0x528c400a84440080, 0x0008301027004280, 0x29003c0c04124300, 0x200802208a080120,
+    0x090c0110c0281220, 0x0340062220218a02, 0x01430101b0300805, 0x0701888244100408,
+    0x0020004104041080, 0x104400e00440c200, 0x0050400e08004100, 0x08e8001082044020,
+    0x0100800400a00201, 0x0269010200829400, 0x0002000411240a08, 0x801320010d051002,
+    0x0415400404080800, 0x4002200410248080, 0x080c012210004281, 0x0a42012248008020,
+    0x2441004441014000, 0x2010008060c82400, 0xe8108c0922011c00, 0x0205014080a40420,
+    0x0003201081600440, 0x0000880804208202, 0x0404241000590104, 0x0110220080080080,
+    0x081806040000d100, 0x2810020200402084, 0x4a94052400026400, 0x44440c0042023300,
+    0x0c88080c300c0408, 0x0206008228202040, 0x0806010406008100, 0x0402006015000800,
+    0x0000280104020040, 0x0088100282002820, 0x841014008401218c, 0x1030010210202090,
+    0x0804028230102320, 0x100083c8080c1000, 0x0000220642080880, 0x2314802a05040880,
+    0x0208001020a20590, 0x0100104230010600, 0x0184900403040004, 0x0008860802002000,
+    0x8c01008050082414, 0x10000c4500901040, 0x0602418100a09000, 0x10c2041020209812,
+    0x1008000390020208, 0x0028822042020210, 0x800040100413848f, 0x00820a4608020080,
+)
+
+FULL = (1 << 64) - 1
+
+
+def _ray_attacks(square, occupied, directions):
+    """Returns the squares a slider attacks by stepping along each ray, used to fill the tables"""
+    attacks = 0
+    for (dfile, drank) in directions:
+        file, rank = (square & 7) + dfile, (square >> 3) + drank
+        while 0 <= file < 8 and 0 <= rank < 8:
+            bit = 1 << (rank*8 + file)
+            attacks |= bit
+            if occupied & bit:
+                break
+            file += dfile
+            rank += drank
+    return attacks
+
+
+def _blocker_mask(square, directions):
+    """Returns the squares that can block a slider, the edge square of each ray never blocks"""
+    mask = 0
+    for (dfile, drank) in directions:
+        file, rank = (square & 7) + dfile, (square >> 3) + drank
+        while 0 <= file+dfile < 8 and 0 <= rank+drank < 8:
+            mask |= 1 << (rank*8 + file)
+            file += dfile
+            rank += drank
+    return mask
+
+
+def _magic_table(square, directions, magic, mask, shift):
+    """Returns the attack table of a slider on square, indexed by the top bits of the magic product"""
+    table = [0] * (1 << (64 - shift))
+    # visit every subset of the mask
+    subset = 0
+    while True:
+        table[((subset * magic) & FULL) >> shift] = _ray_attacks(square, subset, directions)
+        subset = (subset - mask) & mask
+        if not subset:
+            break
+    return table
+
+
+class _Unbuilt:
+    """
+    Stands in for the attack table of a slider on one square until it is first looked up.
+    The lookup builds the table and puts it in the list in its place, so later lookups
+    index a plain list and importing the module does not pay for tables never used
+    """
+    __slots__ = ('tables', 'square', 'directions', 'magic', 'mask', 'shift')
+
+    def __init__(self, tables, square, directions, magic, mask, shift):
+        self.tables = tables
+        self.square = square
+        self.directions = directions
+        self.magic = magic
+        self.mask = mask
+        self.shift = shift
+
+    def __getitem__(self, index):
+        table = _magic_table(self.square, self.directions, self.magic, self.mask, self.shift)
+        self.tables[self.square] = table
+        return table[index]
+
+
+def _magic_tables(directions, magics):
+    """Returns the blocker masks, shifts and attack tables of a slider for every square"""
+    masks = [_blocker_mask(square, directions) for square in range(64)]
+    shifts = [64 - bin(mask).count('1') for mask in masks]
+    tables = [None] * 64
+    for square in range(64):
+        tables[square] = _Unbuilt(tables, square, directions, magics[square], masks[square], shifts[square])
+    return masks, shifts, tables
+
+
+def _between_table():
+    """Returns the squares strictly between every two squares on a rank, file or diagonal, 0 otherwise"""
+    between = [[0] * 64 for _ in range(64)]
+    for square in range(64):
+        for (dfile, drank) in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            file, rank = (square & 7) + dfile, (square >> 3) + drank
+            ray = 0
+            while 0 <= file < 8 and 0 <= rank < 8:
+                between[square][rank*8 + file] = ray
+                ray |= 1 << (rank*8 + file)
+                file += dfile
+                rank += drank
+    return between
+
+
+# BETWEEN[a][b]: squares a slider on b passes to reach a
+BETWEEN = _between_table()
+ROOK_MASKS, ROOK_SHIFTS, ROOK_TABLES = _magic_tables(ROOK_DIRECTIONS, ROOK_MAGICS)
+BISHOP_MASKS, BISHOP_SHIFTS, BISHOP_TABLES = _magic_tables(BISHOP_DIRECTIONS, BISHOP_MAGICS)
+
+
+def rook_attacks(square, occupied):
+    """Returns the squares a rook on square attacks"""
+    return ROOK_TABLES[square][(((occupied & ROOK_MASKS[square]) * ROOK_MAGICS[square]) & FULL) >> ROOK_SHIFTS[square]]
+
+
+def bishop_attacks(square, occupied):
+    """Returns the squares a bishop on square attacks"""
+    return BISHOP_TABLES[square][(((occupied & BISHOP_MASKS[square]) * BISHOP_MAGICS[square]) & FULL) >> BISHOP_SHIFTS[square]]
+
+
+def queen_attacks(square, occupied):
+    """Returns the squares a queen on square attacks"""
+    return rook_attacks(square, occupied) | bishop_attacks(square, occupied)
@@ -0,0 +1,139 @@
+"""
+This file contains the bitboard class.
+
+A bitboard keeps the position as 64 bit integers, one bit per square: twelve piece sets and
+the occupancy of each colour. Square index is rank*8 + file, so a8 is 0 and h1 is 63 (the
+same layout as State). The rules and the search run on State, which already answers attack
+and check queries with bit operations (see attacks.py and State.attackers_of), so this class
+only converts positions to and from State
+"""
+from attacks import WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE
+from board import State, empty_squares
+from pieces import PIECES
+from moves import SYMBOLS
+from zobrist import castling_rights
+
+WHITE = 0
+BLACK = 1
+COLOURS = ('w', 'b')
+
+
+# king and rook square of each castling right
+CASTLES = {
+    WHITE_KING_SIDE: (60, 63),
+    WHITE_QUEEN_SIDE: (60, 56),
+    BLACK_KING_SIDE: (4, 7),
+    BLACK_QUEEN_SIDE: (4, 0),
+}
+
+
+class BitBoard:
+    """
+    BitBoard class keeps a position as bit sets
+    """
+    def __init__(self):
+        """
+        Init method instantiates an empty bitboard
+        Attributes:
+        pieces: twelve bit sets, one per colour and piece type
+        colours: occupancy of white and black
+        occupied: occupancy of both colours
+        board: piece index on each square, -1 when empty
+        turn: colour index of the side to move
+        castling: castling rights
+        ep: square behind a pawn that just double moved, -1 if none
+        """
+        self.pieces = [0] * 12
+        self.colours = [0, 0]
+        self.occupied = 0
+        self.board = [-1] * 64
+        self.turn = WHITE
+        self.castling = 0
+        self.ep = -1
+
+
+    def put(self, index, square):
+        """Places the piece index on square"""
+        bit = 1 << square
+        self.pieces[index] |= bit
+        self.colours[index // 6] |= bit
+        self.occupied |= bit
+        self.board[square] = index
+
+
+    def remove(self, square):
+        """Removes the piece on square and returns its index"""
+        index = self.board[square]
+        bit = 1 << square
+        self.pieces[index] ^= bit
+        self.colours[index // 6] ^= bit
+        self.occupied ^= bit
+        self.board[square] = -1
+        return index
+
+
+    @classmethod
+    def from_state(cls, state):
+        """Builds a bitboard from a State"""
+        bitboard = cls()
+        for (file, rank) in state.squares:
+            piece = state.squares[file, rank].piece
+            if piece is not None:
+                colour = COLOURS.index(piece.colour)
+                bitboard.put(colour*6 + SYMBOLS.index(piece.piece), rank*8 + file)
+        bitboard.turn = COLOURS.index(state.turn)
+
+        # castling rights come from the first_move flags of the kings and rooks
+        bitboard.castling = castling_rights(state)
+
+        if state.enpassant and state.last_move:
+            pawn = state.last_move[1].piece
+            if pawn is not None and pawn.piece == 'P' and pawn.double:
+                behind = pawn.rank + 1 if pawn.colour == 'w' else pawn.rank - 1
+                bitboard.ep = behind*8 + pawn.file
+        return bitboard
+
+
+    def to_state(self):
+        """Builds a State from the bitboard"""
+        state = State()
+        state.squares = empty_squares()
+        for square in range(64):
+            index = self.board[square]
+            if index < 0:
+                continue
+            file, rank = square & 7, square >> 3
+            colour = COLOURS[index // 6]
+            piece = PIECES[SYMBOLS[index % 6]](file, rank, colour)
+            if piece.piece == 'P':
+                piece.first_move = rank == (6 if colour == 'w' else 1)
+            elif piece.piece in ('R', 'K'):
+                piece.first_move = False
+            if piece.piece == 'K':
+                if colour == 'w':
+                    state.wking = piece
+                else:
+                    state.bking = piece
+            state.squares[file, rank].piece = piece
+        state.turn = COLOURS[self.turn]
+
+        for right in CASTLES:
+            if self.castling & right:
+                king, rook = CASTLES[right]
+                state.squares[king & 7, king >> 3].piece.first_move = True
+                state.squares[rook & 7, rook >> 3].piece.first_move = True
+
+        if self.ep >= 0:
+            file = self.ep & 7
+            rank = (self.ep >> 3) - 1 if self.turn == BLACK else (self.ep >> 3) + 1
+            origin = rank + 2 if self.turn == BLACK else rank - 2
+            state.squares[file, rank].piece.double = True
+            state.enpassant = True
+            state.last_move = (state.squares[file, origin], state.squares[file, rank])
+        state.refresh()
+        return state
+
+
+    def snapshot(self):
+        """Returns a hashable copy of the position"""
+        return (tuple(self.pieces), self.turn, self.castling, self.ep)
@@ -1,24 +1,70 @@
 """
 This file contains the board class.
 
-This class is responsible for setting/rendering the board, and conducting moves
+This class is responsible for setting up the board and conducting moves.
+It only holds the rules and the position, and never imports pygame, so the engine, perft
+and search run without a display. Drawing is done by render.py
 """
 
 from collections import defaultdict
-import copy
-import pygame
-from pieces import Pawn, Rook, Knight, Bishop, Queen, King
+from attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, CASTLE_MASK
+from attacks import rook_attacks, bishop_attacks, BETWEEN, FULL
+from pieces import Pawn, Rook, Knight, Bishop, Queen, King, PIECES
+import evaluate
+from evaluate import MG_SCORES, EG_SCORES, PHASE_WEIGHTS
+import zobrist
+from zobrist import PIECE_KEYS, SIDE_KEY, CASTLE_KEYS, EP_KEYS
+from board10x12 import OFF, MAILBOX, empty_board
+from moves import CAPTURE, DOUBLE, ENPASSANT, CASTLE, QUEEN, SYMBOLS
+from history import History
+from movecache import MoveCache
+
+# every (file, rank), files first like the board is set up
+POSITIONS = [(file, rank) for file in range(8) for rank in range(8)]
+POSITIONS_SET = frozenset(POSITIONS)
+
+# legal moves of the positions the GUI asked about recently, shared by all states
+LEGAL_CACHE = MoveCache()
+
+# RGB colour of the light and dark squares
+LIGHT_SQUARE = (238, 219, 179)
+DARK_SQUARE = (181, 135, 99)
+
 
 class Square:
-    """square class contains properties: colour, xy position, coordinates, piece on sq"""
-    def __init__(self, colour=None, sqrcolour=None, position=None, coord=None, piece=None):
-        self.colour = colour
-        # RGB colour
-        self.sqrcolour = sqrcolour
+    """
+    square class contains properties: colour, xy position, piece on sq
+    The piece is kept in the mailbox list, the colour and RGB colour follow from the position
+    """
+    __slots__ = ('board', 'index', 'position')
+
+    def __init__(self, board, position):
+        self.board = board
+        self.index = MAILBOX[position[1]*8 + position[0]]
         self.position = position
-        self.coord = coord
-        # this is a Piece class
-        self.piece = piece
+
+
+    @property
+    def piece(self):
+        """The piece on the square, None if empty"""
+        return self.board[self.index]
+
+
+    @piece.setter
+    def piece(self, piece):
+        self.board[self.index] = piece
+
+
+    @property
+    def colour(self):
+        """Colour of the square, a1 is dark"""
+        return 'w' if (self.position[0] + self.position[1]) % 2 == 0 else 'b'
+
+
+    @property
+    def sqrcolour(self):
+        """RGB colour of the square"""
+        return LIGHT_SQUARE if (self.position[0] + self.position[1]) % 2 == 0 else DARK_SQUARE
 
 
     def get_piece(self):
@@ -31,6 +77,75 @@ class Square:
         return self.position
 
 
+class Squares:
+    """
+    Squares class gives the (file, rank) view of a mailbox list, each key maps to a Square
+    """
+    __slots__ = ('board', 'cells')
+
+    def __init__(self, board=None):
+        """
+        Init method instantiates the view
+        Attributes:
+        board: the 10x12 list
+        cells: Square of each (file, rank), made the first time the square is looked up
+        """
+        self.board = board if board is not None else empty_board()
+        self.cells = {}
+
+
+    def __getitem__(self, position):
+        try:
+            return self.cells[position]
+        except KeyError:
+            square = self.cells[position] = Square(self.board, position)
+            return square
+
+
+    def __contains__(self, position):
+        return position in POSITIONS_SET
+
+
+    def __iter__(self):
+        return iter(POSITIONS)
+
+
+    def __len__(self):
+        return 64
+
+
+    def keys(self):
+        """Returns the (file, rank) of every square, files first like the board is set up"""
+        return POSITIONS
+
+
+    def values(self):
+        """Returns every Square"""
+        return [self[position] for position in POSITIONS]
+
+
+    def items(self):
+        """Returns the (file, rank) and Square of every square"""
+        return [(position, self[position]) for position in POSITIONS]
+
+
+    def __deepcopy__(self, memo):
+        """Copies the pieces into a new list"""
+        board = [piece if piece is None or piece is OFF else memo.get(id(piece)) or piece.__deepcopy__(memo)
+                 for piece in self.board]
+        clone = Squares(board)
+        memo[id(self)] = clone
+        memo[id(self.board)] = board
+        for position, square in self.cells.items():
+            memo[id(square)] = clone[position]
+        return clone
+
+
+def empty_squares():
+    """Returns the 64 squares of a board with no pieces"""
+    return Squares()
+
+
 # Class that represents the state of the board
 class State:
     """
@@ -40,81 +155,177 @@ class State:
         """
         Init method instantiates state object
         Attributes:
-        squares: all squares of the board (each is a square object)
+        squares: all squares of the board (each is a square object), a (file, rank) view of board
+        board: the pieces in a 10x12 mailbox list, see board10x12.py
         last_move: the square where last move was made
         enpassant: tells the board whether enpassant capture is available
         wking: location of white king
         bking: location of black king
-        wpieces: all white pieces
-        bpieces: all black pieces
+        wpieces: all white pieces, kept up to date by make_move and unmake_move
+        bpieces: all black pieces, kept up to date by make_move and unmake_move
+        turn: colour of the side to move
+        occupancy: bit set of the squares holding white and black pieces, bit rank*8 + file
+        occupied: bit set of all occupied squares
+        castling: castling rights, see attacks.py
+        key: zobrist key of the position
+        keys: zobrist keys of the earlier positions, for spotting repetitions
+        halfmove: moves since the last pawn move or capture
+        fullmove: number of the move, starts at 1 and goes up after each black move
+        mg_score, eg_score: middlegame and endgame material and piece-square score, see evaluate.py
+        phase: game phase from the material left
         """
-        self.squares = defaultdict()
+        self.squares = Squares()
         self.last_move = ()
         self.enpassant = False
         self.status = ''
         self.wking = None
         self.bking = None
+        self.wpieces = []
+        self.bpieces = []
+        self.turn = 'w'
+        self.occupancy = {'w': 0, 'b': 0}
+        self.occupied = 0
+        self.castling = 0
+        self.key = 0
+        self.keys = []
+        self.halfmove = 0
+        self.fullmove = 1
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
+
+
+    @property
+    def squares(self):
+        """The (file, rank) view of the board"""
+        return self._squares
+
+
+    @squares.setter
+    def squares(self, squares):
+        self._squares = squares
+        self.board = squares.board
+
+
+    def refresh(self):
+        """
+        Recomputes the piece lists, occupancy, castling rights, zobrist key and evaluation scores
+        from the squares. Needed after placing pieces on the squares directly instead of through make_move
+        """
+        self.occupancy = {'w': 0, 'b': 0}
+        self.wpieces = []
+        self.bpieces = []
+        board = self.board
+        for square in range(64):
+            piece = board[MAILBOX[square]]
+            if piece is not None:
+                self.occupancy[piece.colour] |= 1 << square
+                self.pieces(piece.colour).append(piece)
+        self.occupied = self.occupancy['w'] | self.occupancy['b']
+        self.castling = zobrist.castling_rights(self)
+        self.key = zobrist.compute(self)
+        self.mg_score, self.eg_score, self.phase = evaluate.compute(self)
+
+
+    def pieces(self, colour):
+        """Returns the list of pieces of colour"""
+        if colour == 'w':
+            return self.wpieces
+        return self.bpieces
 
 
     def attack(self, piece):
         """Returns all squares the current piece is attacking"""
-        moves = piece.valid_moves(self)
         atking = []
-        for move in moves:
-            atkfile = move[0]
-            atkrank = move[1]
-            atksq = self.squares[atkfile, atkrank]
-            try:
-                status = move[2]
-                if status == 'E' and self.enpassant:
-                    if piece.colour == 'w':
-                        enpass = (atkfile, atkrank+1)
-                    elif piece.colour == 'b':
-                        enpass = (atkfile, atkrank-1)
-                    atking.append((enpass))
-                elif status == 'X':
-                    if atksq.piece is not None and atksq.piece.colour != piece.colour:
-                        atking.append((atkfile, atkrank))
-            except IndexError:
-                if atksq.piece is not None and atksq.piece.colour != piece.colour:
-                    atking.append((atkfile, atkrank))
+        for move in piece.valid_moves(self):
+            end = (move >> 6) & 63
+            flag = (move >> 12) & 15
+            if flag == ENPASSANT and self.enpassant:
+                # the pawn taken en passant is beside the moving pawn
+                atking.append((end & 7, piece.rank))
+            elif flag == CAPTURE:
+                atking.append((end & 7, end >> 3))
         return atking
 
 
+    def attackers_of(self, square, occupied=None):
+        """
+        Returns the bit set of pieces of both colours attacking square (rank*8 + file)
+        occupied: occupancy to look through, by default the board, pieces off it do not attack
+        Rays and leaper patterns are cast outward from the square, then the piece found on
+        each square they reach is checked
+        """
+        if occupied is None:
+            occupied = self.occupied
+        diagonal = bishop_attacks(square, occupied)
+        straight = rook_attacks(square, occupied)
+        candidates = (KNIGHT_ATTACKS[square] | KING_ATTACKS[square] | PAWN_ATTACKS[0][square] |
+                      PAWN_ATTACKS[1][square] | diagonal | straight) & occupied
+        found = 0
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            piece = self.board[MAILBOX[low.bit_length() - 1]]
+            kind = piece.piece
+            if kind == 'P':
+                # a white pawn attacks square from where a black pawn on square would attack
+                hit = PAWN_ATTACKS[1 if piece.colour == 'w' else 0][square] & low
+            elif kind == 'N':
+                hit = KNIGHT_ATTACKS[square] & low
+            elif kind == 'B':
+                hit = diagonal & low
+            elif kind == 'R':
+                hit = straight & low
+            elif kind == 'Q':
+                hit = (diagonal | straight) & low
+            else:
+                hit = KING_ATTACKS[square] & low
+            found |= hit
+        return found
+
+
+    def is_attacked(self, square, by_colour, occupied=None):
+        """Returns true if a piece of by_colour attacks square (rank*8 + file), stopping at the first attacker"""
+        if occupied is None:
+            occupied = self.occupied
+        board = self.board
+        attackers = self.occupancy[by_colour] & occupied
+        pawns = PAWN_ATTACKS[1 if by_colour == 'w' else 0][square]
+        for (bits, kinds) in ((KNIGHT_ATTACKS[square] & attackers, ('N',)),
+                              (pawns & attackers, ('P',)),
+                              (KING_ATTACKS[square] & attackers, ('K',))):
+            while bits:
+                low = bits & -bits
+                bits ^= low
+                if board[MAILBOX[low.bit_length() - 1]].piece in kinds:
+                    return True
+        for (bits, kinds) in ((bishop_attacks(square, occupied) & attackers, ('B', 'Q')),
+                              (rook_attacks(square, occupied) & attackers, ('R', 'Q'))):
+            while bits:
+                low = bits & -bits
+                bits ^= low
+                if board[MAILBOX[low.bit_length() - 1]].piece in kinds:
+                    return True
+        return False
+
+
     def attack_by(self, player, square):
         """This function outputs all pieces attacking the input square"""
+        (file, rank) = square.position
+        enemy = self.occupancy['b' if player == 'w' else 'w']
+        attackers = self.attackers_of(rank*8 + file) & enemy
         atkby = []
-        for sqr in self.squares:
-            current_piece = self.squares[sqr].piece
-            if current_piece is not None and player != current_piece.colour:
-                if current_piece.piece != 'P':
-                    atks = current_piece.valid_moves(self)
-                else:
-                    if player == 'w':
-                        atks = ((current_piece.file+1, current_piece.rank+1), (current_piece.file-1, current_piece.rank+1))
-                    elif player == 'b':
-                        atks = ((current_piece.file+1, current_piece.rank-1), (current_piece.file-1, current_piece.rank-1))
-                for move in atks:
-                    if square.position == (move[0], move[1]):
-                        atkby.append(current_piece.piece)
+        while attackers:
+            low = attackers & -attackers
+            attackers ^= low
+            atkby.append(self.board[MAILBOX[low.bit_length() - 1]].piece)
         return atkby
 
 
     def check(self, player):
         """Returns true if player in check, otherwise return false"""
-        if player == 'w':
-            king = self.squares[self.wking.file, self.wking.rank].piece
-        elif player == 'b':
-            king = self.squares[self.bking.file, self.bking.rank].piece
-        if king is not None:
-            ksq = self.squares[king.file, king.rank]
-        else:
-            print('no king square')
-            return False
-        atks = self.attack_by(player, ksq)
-        if not atks:
-            return False
-        return True
+        king = self.wking if player == 'w' else self.bking
+        return self.is_attacked(king.rank*8 + king.file, 'b' if player == 'w' else 'w')
 
 
     def checking(self, piece):
@@ -126,10 +337,8 @@ class State:
             if pce.piece == 'K' and pce.colour != piece.colour:
                 if pce.colour == 'w':
                     self.wking.checked = True
-                    self.squares[self.wking.file, self.wking.rank].checked = True
                 elif pce.colour == 'b':
                     self.bking.checked = True
-                    self.squares[self.bking.file, self.bking.rank].checked = True
                 return True
         return False
 
@@ -139,7 +348,7 @@ class State:
         Function that returns true if player is mated
         If there are no legal moves then checkmate
         """
-        if not self.legal_moves(player):
+        if not self.legal(player):
             return True
         return False
 
@@ -147,115 +356,415 @@ class State:
     def checkmate2(self, player, state):
         """
         Function that determins checkmate
-        checks all squares with pieces on them
+        checks all pieces of player
         """
         all_moves = []
-        for square in state.squares:
-            current_pce = state.squares[square].piece
-            if current_pce is not None and current_pce.colour == player:
-                moves = current_pce.valid_moves(state)
-                for move in moves:
-                    try:
-                        newstate = self.move(current_pce, move[0], move[1], state)
-                    except AttributeError:
-                        newstate = 0
-                    if newstate != 0:
-                        all_moves.append((current_pce, move))
+        for current_pce in list(state.pieces(player)):
+            moves = current_pce.valid_moves(state)
+            for move in moves:
+                end = (move >> 6) & 63
+                try:
+                    newstate = self.move(current_pce, end & 7, end >> 3, state)
+                except AttributeError:
+                    newstate = 0
+                if newstate != 0:
+                    all_moves.append((current_pce, move))
         # This means all_moves is empty
         if not all_moves:
             return True
         return False
 
 
+    def legal(self, player=None):
+        """
+        Returns the legal moves of player as a tuple, by default the side to move
+        The moves of the side to move are kept in LEGAL_CACHE by zobrist key, asking again for
+        the same position only looks them up. The key does not tell which en passant captures
+        the other side would have, so its moves are always generated
+        """
+        if player is not None and player != self.turn:
+            return tuple(self.legal_generator(player))
+        moves = LEGAL_CACHE.get(self.key)
+        if moves is None:
+            moves = tuple(self.legal_generator(player))
+            LEGAL_CACHE.put(self.key, moves)
+        return moves
+
+
     def legal_moves(self, player):
         """Function finds all legal moves for player"""
         all_moves = defaultdict(list)
-        for square in self.squares:
-            sqr = self.squares[square]
-            if sqr.piece is not None and sqr.piece.colour == player:
-                for move in sqr.piece.valid_moves(self):
-                    try:
-                        status = move[2]
-                    except IndexError:
-                        status = 0
-                    # if move is castle, check the empty squares
-                    if status == 'C':
-                        # Castle Queen side
-                        if move[0] == 2:
-                            empty_sqr = self.squares[move[0]+1, move[1]]
-                            atks = self.attack_by(sqr.piece.colour, empty_sqr)
-                            # Only allow castle if the squares between are not attacked
-                            if atks:
-                                continue
-                        # Castle King side
-                        elif move[0] == 6:
-                            empty_sqr = self.squares[move[0]-1, move[1]]
-                            atks = self.attack_by(sqr.piece.colour, empty_sqr)
-                            # Only allow castle if the squares between are not attacked
-                            if atks:
-                                continue
-                    if self.try_move(sqr.piece, move[0], move[1]):
-                        all_moves[sqr.position].append((move[0], move[1]))
+        for move in self.legal(player):
+            start = move & 63
+            end = (move >> 6) & 63
+            if (end & 7, end >> 3) not in all_moves[start & 7, start >> 3]:
+                all_moves[start & 7, start >> 3].append((end & 7, end >> 3))
         return all_moves
 
 
-    def try_move(self, piece, file, rank):
+    def generate_legal(self, player=None, moves=None):
+        """
+        Returns a list of all legal moves for player, by default the side to move
+        moves: list to fill instead of a new one, so a search can reuse one list per ply
+        """
+        if moves is None:
+            return list(self.legal_generator(player))
+        moves[:] = self.legal_generator(player)
+        return moves
+
+
+    def checkers_and_pins(self, player):
+        """
+        Returns the enemy pieces checking the king of player, as a bit set, and the absolutely
+        pinned pieces of player: a dict from the square of each pinned piece to the bit set of
+        squares it can still move to (the line between the king and the pinning piece)
+        """
+        king = self.wking if player == 'w' else self.bking
+        square = king.rank*8 + king.file
+        enemy = self.occupancy['b' if player == 'w' else 'w']
+        own = self.occupancy[player]
+        checkers = 0
+        pinned = {}
+
+        # Knights and pawns check from the squares a knight or pawn of player would attack
+        colour = 0 if player == 'w' else 1
+        for (bits, kind) in ((KNIGHT_ATTACKS[square] & enemy, 'N'), (PAWN_ATTACKS[colour][square] & enemy, 'P')):
+            while bits:
+                low = bits & -bits
+                bits ^= low
+                if self.board[MAILBOX[low.bit_length() - 1]].piece == kind:
+                    checkers |= low
+
+        # Sliders on a line with the king check it when nothing is between and pin a lone piece of player
+        straight = rook_attacks(square, 0)
+        snipers = (straight | bishop_attacks(square, 0)) & enemy
+        while snipers:
+            low = snipers & -snipers
+            snipers ^= low
+            origin = low.bit_length() - 1
+            kind = self.board[MAILBOX[origin]].piece
+            if kind == 'Q' or (kind == 'R' and low & straight) or (kind == 'B' and not low & straight):
+                line = BETWEEN[square][origin]
+                blockers = line & self.occupied
+                if not blockers:
+                    checkers |= low
+                elif not blockers & (blockers - 1) and blockers & own:
+                    pinned[blockers.bit_length() - 1] = line | low
+        return checkers, pinned
+
+
+    def legal_generator(self, player=None):
+        """
+        Generator that yields every legal move for player
+        Each move is an encoded integer, see moves.py
+        The checkers and pins are found once: pinned pieces only move along the pin and in
+        check the other pieces must capture the checker or block. King moves and en passant,
+        which can uncover an attack on the king, are still made and tested
+        """
+        if player is None:
+            player = self.turn
+        checkers, pinned = self.checkers_and_pins(player)
+        in_check = checkers != 0
+        king = self.wking if player == 'w' else self.bking
+        if not checkers:
+            evasions = FULL
+        elif checkers & (checkers - 1):
+            # double check: only the king can move
+            evasions = 0
+        else:
+            evasions = checkers | BETWEEN[king.rank*8 + king.file][checkers.bit_length() - 1]
+        enemy = 'b' if player == 'w' else 'w'
+        moves = []
+        # copy the piece list since trying captures takes pieces out and puts them back
+        for piece in list(self.pieces(player)):
+            if piece is king:
+                targets = FULL
+            else:
+                targets = evasions & pinned.get(piece.rank*8 + piece.file, FULL)
+                if not targets:
+                    continue
+            del moves[:]
+            piece.generate(self, moves)
+            for move in moves:
+                flag = (move >> 12) & 15
+                if piece is king:
+                    # if move is castle, the king can not be in check or pass through an attacked square
+                    if flag == CASTLE:
+                        if in_check:
+                            continue
+                        # the square between the king's start and end
+                        if self.is_attacked(((move & 63) + ((move >> 6) & 63)) >> 1, enemy):
+                            continue
+                    if self.try_move(move):
+                        yield move
+                elif flag == ENPASSANT:
+                    if self.try_move(move):
+                        yield move
+                elif targets >> ((move >> 6) & 63) & 1:
+                    yield move
+
+
+    def try_move(self, move):
         """
         Helper function for finding legal moves
 
         This function will try the move and if it leaves own king in check then not allowed
         """
-        try_state = copy.deepcopy(self)
-        try_piece = try_state.squares[piece.file, piece.rank].piece
-        # remove piece on new square
-        del try_state.squares[file, rank].piece
-        try_piece.move_to(file, rank)
-        try_state.squares[file, rank].piece = try_piece
-        # remove piece on old square
-        del try_state.squares[piece.file, piece.rank].piece
-        try_state.squares[piece.file, piece.rank].piece = None
-
-        if try_piece.piece == 'K':
-            if try_piece.colour == 'w':
-                try_state.wking = try_piece
-            elif try_piece.colour == 'b':
-                try_state.bking = try_piece
-        if try_state.check(piece.colour):
-            return False
-        return True
+        player = self.board[MAILBOX[move & 63]].colour
+        undo = self.make_move(move)
+        legal = not self.check(player)
+        self.unmake_move(undo)
+        return legal
+
+
+    def make_move(self, move):
+        """
+        Performs the move in place and returns the record that unmake_move needs to take it back
+        move: encoded integer with origin, target, flag and promotion piece, see moves.py
+        undo record: move, moved piece, captured piece, first_move of the moved piece,
+        pawn whose en passant ran out, enpassant, status, last_move, turn, occupancy,
+        key, castling rights, halfmove clock and evaluation scores
+        """
+        start = move & 63
+        end = (move >> 6) & 63
+        flag = (move >> 12) & 15
+        promotion = move >> 16
+        file, rank, newfile, newrank = start & 7, start >> 3, end & 7, end >> 3
+        board = self.board
+        origin = MAILBOX[start]
+        target = MAILBOX[end]
+        piece = board[origin]
+        keys = PIECE_KEYS[piece.colour]
+        key = self.key ^ SIDE_KEY ^ keys[piece.piece][start]
+        mg_scores = MG_SCORES[piece.colour]
+        eg_scores = EG_SCORES[piece.colour]
+        mg_score = self.mg_score - mg_scores[piece.piece][start]
+        eg_score = self.eg_score - eg_scores[piece.piece][start]
+        phase = self.phase
+        # en passant is only available for one turn
+        doubled = None
+        if self.last_move:
+            last = self.last_move[1].piece
+            if last is not None and last.piece == 'P' and last.double:
+                last.double = False
+                doubled = last
+                key ^= EP_KEYS[last.file]
+        # en passant captures the pawn beside the moving pawn
+        if flag == ENPASSANT:
+            captured = board[MAILBOX[rank*8 + newfile]]
+            board[MAILBOX[rank*8 + newfile]] = None
+            key ^= PIECE_KEYS[captured.colour]['P'][rank*8 + newfile]
+            mg_score -= MG_SCORES[captured.colour]['P'][rank*8 + newfile]
+            eg_score -= EG_SCORES[captured.colour]['P'][rank*8 + newfile]
+        else:
+            captured = board[target]
+            if captured is not None:
+                key ^= PIECE_KEYS[captured.colour][captured.piece][end]
+                mg_score -= MG_SCORES[captured.colour][captured.piece][end]
+                eg_score -= EG_SCORES[captured.colour][captured.piece][end]
+                phase -= PHASE_WEIGHTS[captured.piece]
+        first_move = getattr(piece, 'first_move', None)
+        occupancy = self.occupancy
+        undo = (move, piece, captured, first_move, doubled, self.enpassant, self.status, self.last_move, self.turn,
+                (occupancy['w'], occupancy['b']), self.key, self.castling, self.halfmove,
+                (self.mg_score, self.eg_score, self.phase))
+
+        occupancy[piece.colour] ^= (1 << start) | (1 << end)
+        if captured is not None:
+            self.pieces(captured.colour).remove(captured)
+            if flag == ENPASSANT:
+                occupancy[captured.colour] ^= 1 << (rank*8 + newfile)
+            else:
+                occupancy[captured.colour] ^= 1 << end
+
+        board[origin] = None
+        piece.move_to(newfile, newrank)
+        if first_move is not None:
+            piece.first_move = False
+        # Promotion
+        if promotion:
+            symbol = SYMBOLS[promotion]
+            promoted = PIECES[symbol](newfile, newrank, piece.colour)
+            if symbol == 'R':
+                # a promoted rook never castles
+                promoted.first_move = False
+            board[target] = promoted
+            pieces = self.pieces(piece.colour)
+            pieces.remove(piece)
+            pieces.append(promoted)
+            key ^= keys[symbol][end]
+            mg_score += mg_scores[symbol][end]
+            eg_score += eg_scores[symbol][end]
+            phase += PHASE_WEIGHTS[symbol]
+            self.status = '='
+        else:
+            board[target] = piece
+            key ^= keys[piece.piece][end]
+            mg_score += mg_scores[piece.piece][end]
+            eg_score += eg_scores[piece.piece][end]
+            if captured is not None:
+                self.status = 'x'
+            else:
+                self.status = ''
+        # Castle: the rook jumps to the other side of the king
+        if flag == CASTLE:
+            if newfile == 2:
+                rook_start, rook_end = newrank*8, newrank*8 + 3
+                self.status = '0-0-0'
+            elif newfile == 6:
+                rook_start, rook_end = newrank*8 + 7, newrank*8 + 5
+                self.status = '0-0'
+            rook = board[MAILBOX[rook_start]]
+            board[MAILBOX[rook_start]] = None
+            rook.move_to(rook_end & 7, newrank)
+            board[MAILBOX[rook_end]] = rook
+            rook.first_move = False
+            occupancy[rook.colour] ^= (1 << rook_start) | (1 << rook_end)
+            key ^= keys['R'][rook_start] ^ keys['R'][rook_end]
+            mg_score += mg_scores['R'][rook_end] - mg_scores['R'][rook_start]
+            eg_score += eg_scores['R'][rook_end] - eg_scores['R'][rook_start]
+        # Double move
+        if flag == DOUBLE:
+            piece.double = True
+            self.enpassant = True
+            key ^= EP_KEYS[newfile]
+        else:
+            self.enpassant = False
+        # moving a king or rook, or capturing a rook, loses castling rights
+        castling = self.castling & CASTLE_MASK[start] & CASTLE_MASK[end]
+        key ^= CASTLE_KEYS[self.castling] ^ CASTLE_KEYS[castling]
+        self.castling = castling
+        # the halfmove clock restarts on pawn moves and captures
+        if piece.piece == 'P' or captured is not None:
+            self.halfmove = 0
+        else:
+            self.halfmove += 1
+        self.keys.append(self.key)
+        self.key = key
+        self.mg_score = mg_score
+        self.eg_score = eg_score
+        self.phase = phase
+        self.occupied = occupancy['w'] | occupancy['b']
+        squares = self.squares
+        self.last_move = (squares[file, rank], squares[newfile, newrank])
+        if self.turn == 'b':
+            self.fullmove += 1
+        self.turn = 'b' if self.turn == 'w' else 'w'
+        return undo
+
+
+    def unmake_move(self, undo):
+        """Takes back the move that returned the undo record"""
+        (move, piece, captured, first_move, doubled, enpassant, status, last_move, turn,
+         occupancy, key, castling, halfmove, scores) = undo
+        start = move & 63
+        end = (move >> 6) & 63
+        flag = (move >> 12) & 15
+        file, rank, newfile, newrank = start & 7, start >> 3, end & 7, end >> 3
+        board = self.board
+        origin = MAILBOX[start]
+        target = MAILBOX[end]
+        # Promotion: the promoted piece goes back to being the pawn
+        promoted = board[target]
+        if promoted is not piece:
+            pieces = self.pieces(piece.colour)
+            pieces.remove(promoted)
+            pieces.append(piece)
+        if captured is not None:
+            self.pieces(captured.colour).append(captured)
+        if flag == ENPASSANT:
+            board[target] = None
+            board[MAILBOX[rank*8 + newfile]] = captured
+        else:
+            board[target] = captured
+        piece.move_to(file, rank)
+        board[origin] = piece
+        if first_move is not None:
+            piece.first_move = first_move
+        if flag == DOUBLE:
+            piece.double = False
+        # Castle: put the rook back in the corner
+        if flag == CASTLE:
+            if newfile == 2:
+                rook_start, rook_end = newrank*8, newrank*8 + 3
+            elif newfile == 6:
+                rook_start, rook_end = newrank*8 + 7, newrank*8 + 5
+            rook = board[MAILBOX[rook_end]]
+            board[MAILBOX[rook_end]] = None
+            rook.move_to(rook_start & 7, newrank)
+            board[MAILBOX[rook_start]] = rook
+            rook.first_move = True
+        if doubled is not None:
+            doubled.double = True
+        self.enpassant = enpassant
+        self.status = status
+        self.last_move = last_move
+        self.turn = turn
+        if turn == 'b':
+            self.fullmove -= 1
+        self.occupancy['w'], self.occupancy['b'] = occupancy
+        self.occupied = occupancy[0] | occupancy[1]
+        self.keys.pop()
+        self.key = key
+        self.castling = castling
+        self.halfmove = halfmove
+        self.mg_score, self.eg_score, self.phase = scores
+
+
+    def repetitions(self):
+        """
+        Returns how many times the current position occurred before
+        Only positions since the last pawn move or capture, with the same side to move, can repeat
+        """
+        count = 0
+        for back in range(2, min(self.halfmove, len(self.keys)) + 1, 2):
+            if self.keys[-back] == self.key:
+                count += 1
+        return count
+
+
+    def __eq__(self, other):
+        """Positions are equal when their zobrist keys are"""
+        if not isinstance(other, State):
+            return NotImplemented
+        return self.key == other.key
+
+
+    def __hash__(self):
+        """The zobrist key makes a state usable as a dictionary key"""
+        return self.key
 
 
 class Board:
     """
-    Board class initiates and renders board
+    Board class sets up the position and keeps the game history, it does not draw
     """
-    def __init__(self, display, cellsize):
+    def __init__(self):
         """
         init method that instantiates board object
         Attributes:
-        display: the game display
-        cellsize: size of each square
-        state: state object
-        turn_num: keeps track of the turn number
-        enpass_capture: variable for rendering enpassant
-        castle: variable for rendering castle move
+        history: the moves played and the state at the current ply, see history.py
         """
-        self.display = display
-        self.cellsize = cellsize
-        self.state = State()
-        self.turn_num = 0
-        self.enpass_capture = False
-        self.castle = False
+        self.history = History(State())
+
+
+    @property
+    def state(self):
+        """The state at the current ply of the history"""
+        return self.history.state
+
+
+    @property
+    def turn_num(self):
+        """Number of moves played to reach the current position"""
+        return self.history.ply
 
 
     def set_board(self):
         """
-        class sets up the board and renders it to the game display
+        class sets up the pieces in their starting squares, drawing them is left to the renderer
         """
         board_size = 8
-        buffer = 25
-        white = (238, 219, 179)
-        black = (181, 135, 99)
         lines = [0, 1, 6, 7]
         placed = 0
         order = ['rookb', 'pawnb', 'pawnw', 'rookw',
@@ -266,26 +775,10 @@ class Board:
                  'bishopb', 'pawnb', 'pawnw', 'bishopw',
                  'knightb', 'pawnb', 'pawnw', 'knightw',
                  'rookb', 'pawnb', 'pawnw', 'rookw']
-        squares = defaultdict()
-        switch = False
-        # Draws the board and initializes starting positions of pieces
+        squares = Squares()
+        # Initializes starting positions of pieces
         for file in range(board_size):
-            switch = not switch
             for rank in range(board_size):
-                xfile = self.cellsize*file+buffer
-                yrank = self.cellsize*rank+buffer
-                if switch:
-                    # draw square
-                    pygame.draw.rect(self.display, white, [xfile, yrank, self.cellsize, self.cellsize])
-                    # set property for the current square
-                    squares[file, rank] = Square('w', white, (file, rank), (xfile, yrank))
-                    switch = False
-                elif not switch:
-                    # draw square on display
-                    pygame.draw.rect(self.display, black, [xfile, yrank, self.cellsize, self.cellsize])
-                    # set property for current square
-                    squares[file, rank] = Square('b', black, (file, rank), (xfile, yrank))
-                    switch = True
                 if rank in lines:
                     current_piece = order[placed]
                     # Initialize pieces
@@ -315,153 +808,22 @@ class Board:
                     elif 'kingw' in current_piece:
                         piece = King(file, rank, 'w')
                         self.state.wking = piece
-                    image = pygame.image.load(piece.img)
-                    # Draw piece onto the board
-                    self.display.blit(image, squares[file, rank].coord)
                     # Set piece for the current square
                     squares[file, rank].piece = piece
                     placed += 1
-        pygame.display.update()
         self.state.squares = squares
-        self.enpass_capture = False
-        self.castle = False
-
-
-    def move(self, piece, newfile, newrank, state):
-        """
-        Function that performs the move
-        """
-        file = piece.file
-        rank = piece.rank
-        newstate = copy.deepcopy(state)
-        npiece = newstate.squares[file, rank].piece
-        moves = npiece.valid_moves(newstate)
-
-        for move in moves:
-            xfile = move[0]
-            yrank = move[1]
-            if (newfile, newrank) == (xfile, yrank):
-                # Promotion
-                if npiece.piece == 'P' and (newrank == 0 or newrank == 7):
-                    newstate.squares[newfile, newrank].piece = Queen(newfile, newrank, npiece.colour)
-                    del newstate.squares[file, rank].piece
-                    newstate.squares[file, rank].piece = None
-                    newstate.status = '='
-                    return newstate
-                # Check for special moves
-                try:
-                    status = move[2]
-                except IndexError:
-                    status = 0
-
-                # Castle move
-                if status == 'C':
-                    # Variable for rendering castle move
-                    self.castle = True
-                    # Move the king
-                    npiece.move_to(newfile, newrank)
-                    newstate.squares[newfile, newrank].piece = npiece
-                    del newstate.squares[file, rank].piece
-                    newstate.squares[file, rank].piece = None
-
-                    if npiece.colour == 'w':
-                        newstate.wking = npiece
-                    elif npiece.colour == 'b':
-                        newstate.bking = npiece
-
-                    # Castle Queen side
-                    if newfile == 2:
-                        # Set the rook to the right side of King
-                        newstate.squares[newfile+1, newrank].piece = newstate.squares[newfile-2, newrank].piece
-                        newstate.squares[newfile+1, newrank].piece.move_to(newfile+1, newrank)
-                        newstate.squares[newfile+1, newrank].piece.first_move = False
-                        # remove the old rook
-                        del newstate.squares[newfile-2, newrank].piece
-                        newstate.squares[newfile-2, newrank].piece = None
-                        newstate.status = '0-0-0'
-                    # Castle King side
-                    elif newfile == 6:
-                        # Set the rook to the left side of King
-                        newstate.squares[newfile-1, newrank].piece = newstate.squares[newfile+1, newrank].piece
-                        newstate.squares[newfile-1, newrank].piece.move_to(newfile-1, newrank)
-                        newstate.squares[newfile-1, newrank].piece.first_move = False
-                        # remove the old rook
-                        del newstate.squares[newfile+1, newrank].piece
-                        newstate.squares[newfile+1, newrank].piece = None
-                        newstate.status = '0-0'
-                    npiece.first_move = False
-                    return newstate
-                # Double move
-                elif status == 'D':
-                    npiece.double = True
-                    npiece.first_move = False
-                    npiece.move_to(newfile, newrank)
-                    # set piece on new square
-                    newstate.squares[newfile, newrank].piece = npiece
-                    # delete the piece on old square
-                    del newstate.squares[file, rank].piece
-                    newstate.squares[file, rank].piece = None
-                    # Change variables
-                    newstate.enpassant = True
-                    newstate.status = ''
-                    return newstate
-                # en passant
-                elif status == 'E' and newstate.enpassant:
-                    npiece.move_to(newfile, newrank)
-                    # Delete/set the piece on new position
-                    del newstate.squares[newfile, newrank].piece
-                    newstate.squares[newfile, newrank].piece = npiece
-                    # Delete/set the piece on old position
-                    del newstate.squares[file, rank].piece
-                    newstate.squares[file, rank].piece = None
-
-                    # if piece is white, pawns go up, if black then goes down
-                    if npiece.colour == 'w':
-                        del newstate.squares[newfile, newrank+1].piece
-                        newstate.squares[newfile, newrank+1].piece = None
-                    elif npiece.colour == 'b':
-                        del newstate.squares[newfile, newrank-1].piece
-                        newstate.squares[newfile, newrank-1].piece = None
-                    # Tell the board that the next move cannot be an en passant move
-                    newstate.enpassant = False
-                    # Set variable for rendering enpassant
-                    self.enpass_capture = True
-                    newstate.status = 'x'
-                    return newstate
-                elif piece.piece == 'K':
-                    npiece.first_move = False
-                    npiece.checked = False
-                    npiece.move_to(newfile, newrank)
-                    # set new piece
-                    del newstate.squares[newfile, newrank].piece
-                    newstate.squares[newfile, newrank].piece = npiece
-                    # delete old piece
-                    del newstate.squares[file, rank].piece
-                    newstate.squares[file, rank].piece = None
-
-                    # Set the current position of the king
-                    if npiece.colour == 'w':
-                        newstate.wking = npiece
-                    elif npiece.colour == 'b':
-                        newstate.bking = npiece
-
-                    self.castle = False
-                    newstate.status = ''
-                    newstate.enpassant = False
-                    return newstate
-                npiece.move_to(newfile, newrank)
-                try:
-                    npiece.first_move = False
-                except AttributeError:
-                    pass
-                del newstate.squares[newfile, newrank].piece
-                newstate.squares[newfile, newrank].piece = npiece
-                del newstate.squares[file, rank].piece
-                newstate.squares[file, rank].piece = None
-                newstate.enpassant = False
-                if status == 'X':
-                    newstate.status = 'x'
-                else:
-                    newstate.status = ''
-                return newstate
+        self.state.refresh()
+        self.history.reset(self.state)
+
+
+    def move(self, piece, newfile, newrank, state, promotion=QUEEN):
+        """
+        Function that performs the move on the state in place and records it in the history
+        promotion: piece type a pawn reaching the last rank becomes, see moves.py
+        Returns the state, or 0 if the piece can not move there
+        """
+        end = newrank*8 + newfile
+        for move in piece.valid_moves(state):
+            if (move >> 6) & 63 == end and move >> 16 in (0, promotion):
+                return self.history.push(move)
         return 0
@@ -0,0 +1,32 @@
+"""
+This file contains the mailbox board.
+
+The 64 squares sit inside a 10x12 list: two rows of sentinels above and below the board
+and one column each side. A step off the board by a knight or king lands on a sentinel, so
+off board tests are a single comparison and reading a square is a single list index
+"""
+
+# marks the squares around the board
+OFF = object()
+
+# MAILBOX[rank*8 + file] is the index of the square in the 10x12 list
+MAILBOX = [(rank + 2) * 10 + file + 1 for rank in range(8) for file in range(8)]
+# SQUARES[index] is the rank*8 + file square of an index of the 10x12 list, -1 for sentinels
+SQUARES = [-1] * 120
+for _square, _index in enumerate(MAILBOX):
+    SQUARES[_index] = _square
+
+# steps between neighbouring squares of the 10x12 list
+KNIGHT_STEPS = (-21, -19, -12, -8, 8, 12, 19, 21)
+KING_STEPS = (-11, -10, -9, -1, 1, 9, 10, 11)
+
+
+# the 10x12 list of an empty board, copied by empty_board
+EMPTY_BOARD = [OFF] * 120
+for _index in MAILBOX:
+    EMPTY_BOARD[_index] = None
+
+
+def empty_board():
+    """Returns a 10x12 list with no pieces on the board and sentinels around it"""
+    return EMPTY_BOARD[:]
@@ -2,10 +2,17 @@
 The main file:
 Handles starting the game
 """
+import os
+import time
 import pygame
 import pygame.freetype
-from board import Board
+from board import Board, LEGAL_CACHE
 from player import Player
+from engine import EngineWorker
+from moves import QUEEN, move_name
+from sprites import preload
+from render import Renderer
+from latency import Histogram
 
 def notation(position):
     """
@@ -25,21 +32,44 @@ def text_objects(text, font):
     return textsurface, textsurface.get_rect()
 
 
-def undo_move(states, movelist, board):
-    """Undo the last move"""
-    if board.turn_num < 1:
-        print('No more moves to undo')
-        return
-    curr, new = states[board.turn_num].last_move
-    del states[board.turn_num]
-    del movelist[board.turn_num-1]
-    board.turn_num -= 1
-    square1 = states[board.turn_num].squares[curr.position]
-    square2 = states[board.turn_num].squares[new.position]
-    pygame.draw.rect(GAME_DISPLAY, square2.sqrcolour, [square2.coord[0], square2.coord[1], CELLSIZE, CELLSIZE])
-    pygame.draw.rect(GAME_DISPLAY, square1.sqrcolour, [square1.coord[0], square1.coord[1], CELLSIZE, CELLSIZE])
-    image = pygame.image.load(square1.piece.img)
-    GAME_DISPLAY.blit(image, square1.coord)
+def undo_move(board, movelist):
+    """
+    Takes back the last move, or the engine's reply and the move before it
+    The board is redrawn from the state on the next event
+    """
+    if WORKER is not None:
+        WORKER.cancel()
+    # while the engine is thinking there is no reply to take back yet
+    plies = 2 if ENGINE is not None and board.state.turn != ENGINE and board.turn_num > 1 else 1
+    for _ in range(plies):
+        if board.history.undo() is None:
+            print('No more moves to undo')
+            break
+    print(movelist[:board.turn_num], '\n')
+
+
+def redo_move(board, movelist):
+    """Plays the next undone move again, or the move and the engine's reply"""
+    if WORKER is not None:
+        WORKER.cancel()
+    plies = 2 if ENGINE is not None else 1
+    for _ in range(plies):
+        if board.history.redo() is None:
+            print('No more moves to redo')
+            break
+    print(movelist[:board.turn_num], '\n')
+
+
+def game_over(state):
+    """Returns checkmate, stalemate and the king to highlight for the side to move of state"""
+    king = state.wking if state.turn == 'w' else state.bking
+    if state.checkmate(state.turn):
+        if state.check(state.turn):
+            return True, False, king
+        return False, True, king
+    if state.repetitions() >= 2:
+        return False, True, king
+    return False, False, None
 
 
 def quit_game():
@@ -53,84 +83,62 @@ def reset_(xposition, yposition, buttonx, buttony, action=None):
     Function that deals with rendering reset button
     """
     if (buttonx+175) > xposition > buttonx and (buttony+60) > yposition > buttony:
-        pygame.draw.rect(GAME_DISPLAY, PEACH, [buttonx, buttony, 175, 60])
-        GAME_DISPLAY.blit(RESET[0], RESET[1])
+        RENDERER.button(RESET, buttonx, buttony, True, PEACH)
         if action:
             print('Starting new game...')
             action()
     else:
-        pygame.draw.rect(GAME_DISPLAY, DARK_WOOD, [buttonx, buttony, 175, 60])
-        GAME_DISPLAY.blit(RESET[0], RESET[1])
+        RENDERER.button(RESET, buttonx, buttony, False, DARK_WOOD)
 
 
-def undo_(xposition, yposition, buttonx, buttony, states=None, movelist=None, board=None, action=None):
-    """Function that deals with rendering undo button"""
+def undo_(xposition, yposition, buttonx, buttony, board=None, movelist=None, action=None):
+    """
+    Function that deals with rendering undo button
+    Returns True when the button was clicked and the action ran
+    """
     if (buttonx+175) > xposition > buttonx and (buttony+60) > yposition > buttony:
-        pygame.draw.rect(GAME_DISPLAY, PEACH, [buttonx, buttony, 175, 60])
-        GAME_DISPLAY.blit(UNDO[0], UNDO[1])
+        RENDERER.button(UNDO, buttonx, buttony, True, PEACH)
         if action:
-            pass
-            #action(states, movelist, board)
+            action(board, movelist)
+            return True
     else:
-        pygame.draw.rect(GAME_DISPLAY, DARK_WOOD, [buttonx, buttony, 175, 60])
-        GAME_DISPLAY.blit(UNDO[0], UNDO[1])
+        RENDERER.button(UNDO, buttonx, buttony, False, DARK_WOOD)
+    return False
 
 
 def quit_(xposition, yposition, buttonx, buttony, action=None):
     """Function that deals with rendering quit button"""
     if (buttonx+175) > xposition > buttonx and (buttony+60) > yposition > buttony:
-        pygame.draw.rect(GAME_DISPLAY, PEACH, [buttonx, buttony, 175, 60])
-        GAME_DISPLAY.blit(QUIT[0], QUIT[1])
+        RENDERER.button(QUIT, buttonx, buttony, True, PEACH)
         if action:
             print('Quitting game...')
             action()
     else:
-        pygame.draw.rect(GAME_DISPLAY, DARK_WOOD, [buttonx, buttony, 175, 60])
-        GAME_DISPLAY.blit(QUIT[0], QUIT[1])
+        RENDERER.button(QUIT, buttonx, buttony, False, DARK_WOOD)
 
 
 def lit_square(xposition, yposition, current_piece, state, clicked=False):
-    """Function that highlights square when hovering over it"""
-    if current_piece is not None:
-        moves = current_piece.valid_moves(state)
-    else:
-        moves = []
-
-    for square in state.squares:
-        sqr = state.squares[square]
-        pce = state.squares[square].piece
-        (x_sq, y_sq) = sqr.coord
-        if (x_sq+CELLSIZE) > xposition > x_sq and (y_sq+CELLSIZE) > yposition > y_sq:
-            if clicked:
-                for move in moves:
-                    file = move[0]
-                    rank = move[1]
-                    if sqr.position == (file, rank):
-                        pygame.draw.rect(GAME_DISPLAY, GREEN, [x_sq, y_sq, CELLSIZE, CELLSIZE])
-                        if pce is not None:
-                            image = pygame.image.load(pce.img)
-                            GAME_DISPLAY.blit(image, (x_sq, y_sq))
-            elif pce is not None:
-                pygame.draw.rect(GAME_DISPLAY, GREEN, [x_sq, y_sq, CELLSIZE, CELLSIZE])
-                image = pygame.image.load(pce.img)
-                GAME_DISPLAY.blit(image, (x_sq, y_sq))
-        else:
-            pygame.draw.rect(GAME_DISPLAY, sqr.sqrcolour, [x_sq, y_sq, CELLSIZE, CELLSIZE])
-            if pce is not None:
-                image = pygame.image.load(pce.img)
-                GAME_DISPLAY.blit(image, (x_sq, y_sq))
+    """
+    Function that highlights square when hovering over it
+    Only the square the mouse left and the square it entered are redrawn
+    """
+    position = RENDERER.position(xposition, yposition)
+    if position is not None:
+        if clicked:
+            # a clicked piece lights up its own square and the squares it can legally move to
+            start = current_piece.rank*8 + current_piece.file
+            end = position[1]*8 + position[0]
+            if end != start and not any(move & 4095 == start | end << 6 for move in state.legal(current_piece.colour)):
+                position = None
+        elif state.squares[position].piece is None:
+            position = None
+    RENDERER.highlight(state, 'hover', position, GREEN)
 
 
 def lit_check(piece, state):
-    """Hilights king when in check"""
-    file = piece.file
-    rank = piece.rank
-    sqr = state.squares[file, rank]
-    (x_sq, y_sq) = sqr.coord
-
-    pygame.draw.rect(GAME_DISPLAY, RED, [x_sq, y_sq, CELLSIZE, CELLSIZE])
-    image = pygame.image.load(piece.img)
-    GAME_DISPLAY.blit(image, (x_sq, y_sq))
+    """Hilights king when in check, no piece takes the highlight off"""
+    position = None if piece is None else (piece.file, piece.rank)
+    RENDERER.highlight(state, 'check', position, RED)
 
 
 def move_notation(state, piece, square, checkmate, stalemate, status):
@@ -166,65 +174,54 @@ def render_buttons(buttonx, buttony):
     GAME_DISPLAY.blit(QUIT[0], QUIT[1])
 
 
-def render_move(file, rank, current_square, new_state, board):
-    """function that makes moves and renders moves"""
-    xold = CELLSIZE*current_square.position[0]+BUFFER
-    yold = CELLSIZE*current_square.position[1]+BUFFER
-    xnew = CELLSIZE*new_state.squares[file, rank].position[0]+BUFFER
-    ynew = CELLSIZE*new_state.squares[file, rank].position[1]+BUFFER
-    if current_square.colour == 'b':
-        col = DARKSQ
-        clr = LIGHTSQ
-    elif current_square.colour == 'w':
-        col = LIGHTSQ
-        clr = DARKSQ
-    if new_state.squares[file, rank].colour == 'b':
-        colr = DARKSQ
-    elif new_state.squares[file, rank].colour == 'w':
-        colr = LIGHTSQ
-
-    # Erases old square
-    pygame.draw.rect(GAME_DISPLAY, col, [xold, yold, CELLSIZE, CELLSIZE])
-    # Capture: Erase the piece on captured square
-    if new_state.squares[file, rank].piece is not None:
-        pygame.draw.rect(GAME_DISPLAY, colr, [xnew, ynew, CELLSIZE, CELLSIZE])
-    # En Passant (Maybe need new function)
-    if board.enpass_capture:
-        board.enpass_capture = False
-        if new_state.squares[file, rank].piece.colour == 'b':
-            ypos = (CELLSIZE*(new_state.squares[file, rank].piece.rank-1))+BUFFER
-        elif new_state.squares[file, rank].piece.colour == 'w':
-            ypos = (CELLSIZE*(new_state.squares[file, rank].piece.rank+1))+BUFFER
-        xpos = (CELLSIZE*new_state.squares[file, rank].piece.file)+BUFFER
-        pygame.draw.rect(GAME_DISPLAY, clr, [xpos, ypos, CELLSIZE, CELLSIZE])
-    # Castle (need to make new function for this)
-    if board.castle:
-        board.castle = False
-        if file == 2:
-            rook = new_state.squares[file+1, rank].piece
-            image = pygame.image.load(rook.img)
-            xpos = (CELLSIZE*(new_state.squares[file, rank].position[0]-2))+BUFFER
-            ypos = (CELLSIZE*new_state.squares[file, rank].position[1])+BUFFER
-            if new_state.squares[file+1, rank].colour == 'w':
-                clr = DARKSQ
-            elif new_state.squares[file+1, rank].colour == 'b':
-                clr = LIGHTSQ
-            GAME_DISPLAY.blit(image, ((CELLSIZE*(file+1))+BUFFER, CELLSIZE*rank+BUFFER))
-            pygame.draw.rect(GAME_DISPLAY, clr, [xpos, ypos, CELLSIZE, CELLSIZE])
-        elif file == 6:
-            rook = new_state.squares[file-1, rank].piece
-            image = pygame.image.load(rook.img)
-            xpos = (CELLSIZE*(new_state.squares[file, rank].position[0]+1))+BUFFER
-            ypos = CELLSIZE*new_state.squares[file, rank].position[1]+BUFFER
-            if new_state.squares[file-1, rank].colour == 'w':
-                clr = LIGHTSQ
-            elif new_state.squares[file-1, rank].colour == 'b':
-                clr = DARKSQ
-            GAME_DISPLAY.blit(image, ((CELLSIZE*(file-1))+BUFFER, CELLSIZE*rank+BUFFER))
-            pygame.draw.rect(GAME_DISPLAY, clr, [xpos, ypos, CELLSIZE, CELLSIZE])
-    # Draws the current piece onto new square
-    image = pygame.image.load(new_state.squares[file, rank].piece.img)
-    GAME_DISPLAY.blit(image, (CELLSIZE*file+BUFFER, CELLSIZE*rank+BUFFER))
+def play_move(board, piece, file, rank, allmoves, promotion=QUEEN):
+    """
+    Function that makes a move on the board, renders it and records it in the move list
+    promotion: piece type a pawn reaching the last rank becomes
+    Returns checkmate, stalemate and the king to highlight when the game is over
+    """
+    new_state = board.move(piece, file, rank, board.state, promotion or QUEEN)
+    new_sq = new_state.squares[file, rank]
+    new_piece = new_sq.piece
+    RENDERER.draw_move(new_state, board.history.moves[board.turn_num-1])
+
+    # check if enemy king is in check, a discovered check or the rook after castling gives it too
+    status = new_state.check(new_state.turn)
+    king = new_state.wking if new_state.turn == 'w' else new_state.bking
+    king.checked = status
+    checkmate, stalemate, checkmate_king = game_over(new_state)
+    if checkmate:
+        print('White King is mated: BLACK WINS' if new_state.turn == 'w' else 'Black King is mated: WHITE WINS')
+    elif stalemate:
+        # no legal move without being in check, or the same position a third time
+        print('Stalemate' if new_state.checkmate(new_state.turn) else 'Draw by repetition')
+    # record move to move list, dropping the notation of moves that were undone
+    del allmoves[board.turn_num-1:]
+    allmoves.append(move_notation(new_state, new_piece, new_sq, checkmate, stalemate, status))
+
+    if DEBUG:
+        if status:
+            print('Enemy King is in check')
+    print(allmoves, '\n')
+    return checkmate, stalemate, checkmate_king
+
+
+def think(board):
+    """
+    Function that asks the engine worker to search the current state
+    The move comes back as an ENGINE_EVENT while the game loop keeps running
+    """
+    return WORKER.search(board.state, ENGINE_TIME)
+
+
+def engine_move(board, move, score, allmoves):
+    """Function that plays the move the engine found"""
+    if DEBUG:
+        print('Engine plays', move_name(move), 'score', score)
+    start = move & 63
+    end = (move >> 6) & 63
+    piece = board.state.squares[start & 7, start >> 3].piece
+    return play_move(board, piece, end & 7, end >> 3, allmoves, move >> 16)
 
 
 def start_game():
@@ -245,8 +242,13 @@ def start_game():
     render_buttons(buttonx, buttony)
 
     # Initializes and draws chess board
-    board = Board(GAME_DISPLAY, CELLSIZE)
+    board = Board()
     board.set_board()
+    # the renderer draws the squares over again from here on
+    RENDERER.reset()
+    RENDERER.draw_board(board.state)
+    # the labels are outside the squares the renderer updates, put the whole window up once
+    pygame.display.update()
 
     # game loop
     game_exit = False
@@ -254,10 +256,8 @@ def start_game():
     curr_state = board.state
     curr_sq = None
     curr_piece = None
-    # all states and all moves
-    states = []
+    # all moves
     allmoves = []
-    states.append(curr_state)
     # check mate variables
     checkmate = False
     stalemate = False
@@ -265,15 +265,55 @@ def start_game():
     # piece clicked and turn variables
     piece_clicked = False
     turn = 'w'
-
+    # a search left over from the last game is of no use
+    if WORKER is not None:
+        WORKER.cancel()
+    if ENGINE == turn:
+        think(board)
+
+    # frames are capped by the clock, and between frames the loop sleeps until there is input
+    clock = pygame.time.Clock()
+    waited = time.perf_counter()
     while not game_exit:
+        if pygame.event.peek():
+            # input that came in while the clock held the last frame back has waited since then
+            events = pygame.event.get()
+        else:
+            events = [pygame.event.wait()] + pygame.event.get()
+            waited = time.perf_counter()
+        started = time.perf_counter()
         # quits the game when exit is pressed
-        for event in pygame.event.get():
+        for event in events:
             # Exit game
             if event.type == pygame.QUIT:
                 print('Quitting game...')
                 game_exit = True
 
+            # Left and right arrow keys step back and forth through the moves
+            if event.type == pygame.KEYDOWN and event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                if event.key == pygame.K_LEFT:
+                    undo_move(board, allmoves)
+                else:
+                    redo_move(board, allmoves)
+                curr_state = board.state
+                RENDERER.draw_board(curr_state)
+                turn = curr_state.turn
+                piece_clicked = False
+                checkmate, stalemate, checkmate_king = game_over(curr_state)
+                # the engine replies once there are no more moves to redo
+                if ENGINE == turn and board.turn_num == len(board.history) and not checkmate and not stalemate:
+                    think(board)
+
+            # The engine worker found a move, it only counts if the position did not change since
+            if event.type == ENGINE_EVENT:
+                if 'error' in event.dict:
+                    print('The engine failed:', event.error)
+                elif (event.request == WORKER.generation and event.key == curr_state.key and
+                        ENGINE == turn and event.move is not None and not checkmate and not stalemate):
+                    checkmate, stalemate, checkmate_king = engine_move(board, event.move, event.score, allmoves)
+                    turn = curr_state.turn
+                continue
+
             if not checkmate and not stalemate:
                 # mouse position
                 (x_pos, y_pos) = pygame.mouse.get_pos()
@@ -282,7 +322,14 @@ def start_game():
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     # Buttons: reset and quit buttons
                     reset_(x_pos, y_pos, buttonx, buttony, start_game)
-                    undo_(x_pos, y_pos, buttonx, (buttony+85), states, allmoves, board, undo_move)
+                    if undo_(x_pos, y_pos, buttonx, (buttony+85), board, allmoves, undo_move):
+                        curr_state = board.state
+                        RENDERER.draw_board(curr_state)
+                        turn = curr_state.turn
+                        if ENGINE == turn:
+                            think(board)
+                        piece_clicked = False
+                        checkmate, stalemate, checkmate_king = game_over(curr_state)
                     quit_(x_pos, y_pos, buttonx, (buttony+170), quit_game)
 
                     # Mouse out of bounds
@@ -301,72 +348,11 @@ def start_game():
                             legalmoves = curr_state.legal_moves(curr_piece.colour)
                             # Only make move if intended move is in set of legal moves
                             if (file, rank) in legalmoves[curr_sq.position]:
-                                new_state = board.move(curr_piece, file, rank, curr_state)
-                                new_sq = new_state.squares[file, rank]
-                                new_piece = new_sq.piece
-                                render_move(file, rank, curr_sq, new_state, board)
-
-                                # Increment turn counter
-                                board.turn_num += 1
-                                
-                                # Sets variable so en passant capture only availble for one turn
-                                try:
-                                    # set the last move
-                                    pos = new_state.last_move[1].position
-                                    new_state.squares[pos].piece.double = False
-                                except (AttributeError, KeyError, IndexError):
-                                    pass
-                                
-                                # check if enemy king is in check
-                                status = new_state.checking(new_piece)
-                                if status and new_piece.colour == 'w':
-                                    new_state.bking.checked = True
-                                    ismate = new_state.checkmate('b')
-                                    if ismate:
-                                        print('Black King is mated: WHITE WINS')
-                                        checkmate = True
-                                        checkmate_king = new_state.bking
-                                elif status and new_piece.colour == 'b':
-                                    new_state.wking.checked = True
-                                    ismate = new_state.checkmate('w')
-                                    if ismate:
-                                        print('White King is mated: BLACK WINS')
-                                        checkmate = True
-                                        checkmate_king = new_state.wking
-                                else:
-                                    if new_piece.colour == 'w':
-                                        new_state.bking.checked = False
-                                        ismate = new_state.checkmate('b')
-                                        if ismate:
-                                            print('Stalemate')
-                                            stalemate = True
-                                            checkmate_king = new_state.bking
-                                    elif new_piece.colour == 'b':
-                                        new_state.wking.checked = False
-                                        ismate = new_state.checkmate('w')
-                                        if ismate:
-                                            print('Stalemate')
-                                            stalemate = True
-                                            checkmate_king = new_state.wking
-                                # record move to move list
-                                allmoves.append(move_notation(new_state, new_piece, new_sq, checkmate, stalemate, status))
-
-                                new_state.last_move = (curr_sq, new_sq)
-                                # save new state
-                                states.append(new_state)
-                                del curr_state
-                                curr_state = new_state
-
-                                # Update the turn counter
-                                if turn == 'w':
-                                    turn = 'b'
-                                elif turn == 'b':
-                                    turn = 'w'
-
-                                if DEBUG:
-                                    if status:
-                                        print('Enemy King is in check')
-                                print(allmoves, '\n')
+                                checkmate, stalemate, checkmate_king = play_move(board, curr_piece, file, rank, allmoves)
+                                turn = curr_state.turn
+                                # the engine replies to the move
+                                if ENGINE == turn and not checkmate and not stalemate:
+                                    think(board)
                         else:
                             piece_clicked = True
                     else:       #click
@@ -420,12 +406,14 @@ def start_game():
                                 sentence = ''
                                 sentence2 = ''
                                 for move in valid_moves:
-                                    sentence += notation(move)
+                                    end = (move >> 6) & 63
+                                    sentence += notation((end & 7, end >> 3))
                                 print('Valid moves:', sentence)
                                 for move in atkingsq:
                                     sentence2 += notation(move)
                                 print('attacking:', sentence2)
                             ########################################################################
+                lit_check(None, curr_state)
                 if piece_clicked:
                     lit_square(x_pos, y_pos, curr_piece, curr_state, True)
                 else:
@@ -438,27 +426,47 @@ def start_game():
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     # Buttons: reset and quit
                     reset_(x_pos, y_pos, buttonx, buttony, start_game)
-                    undo_(x_pos, y_pos, buttonx, (buttony+85), states, allmoves, board, undo_move)
+                    if undo_(x_pos, y_pos, buttonx, (buttony+85), board, allmoves, undo_move):
+                        curr_state = board.state
+                        RENDERER.draw_board(curr_state)
+                        turn = curr_state.turn
+                        if ENGINE == turn:
+                            think(board)
+                        checkmate, stalemate, checkmate_king = game_over(curr_state)
+                        continue
                     quit_(x_pos, y_pos, buttonx, (buttony+170), quit_game)
                 lit_check(checkmate_king, curr_state)
             # Buttons
             reset_(x_pos, y_pos, buttonx, buttony)
             undo_(x_pos, y_pos, buttonx, (buttony+85))
             quit_(x_pos, y_pos, buttonx, (buttony+170))
-        pygame.display.update()
+        RENDERER.update()
+        drawn = time.perf_counter()
+        FRAME_TIMES.record(drawn - started)
+        INPUT_LATENCY.record(drawn - waited)
+        clock.tick(FRAME_RATE)
+        waited = time.perf_counter()
+    if DEBUG:
+        for histogram in (FRAME_TIMES, INPUT_LATENCY):
+            print('\n'.join(histogram.report()))
+        print('legal move cache:', LEGAL_CACHE.stats())
     # closes pygame
     pygame.quit()
     quit()
 
-# initiate pygame
-pygame.init()
-
 # DEBUG VARIABLE
 DEBUG = True
 
-# load font
-LABELFONT = pygame.freetype.Font('/home/johnx/Projects/chess/font/OpenSans-Semibold.ttf', 15)
-BUTTONFONT = pygame.font.Font('/home/johnx/Projects/chess/font/OpenSans-Semibold.ttf', 20)
+# Colour played by the engine ('w' or 'b'), None for two human players
+ENGINE = None
+# Seconds the engine searches for each move
+ENGINE_TIME = 2.0
+# Event the engine worker posts its move with, and the worker, started by main
+ENGINE_EVENT = pygame.USEREVENT + 1
+WORKER = None
+
+# font, found next to this file
+FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'font', 'OpenSans-Semibold.ttf')
 
 # set colours
 WHITE = (255, 255, 255)
@@ -477,6 +485,12 @@ DARK_WOOD = (181, 135, 99)
 LIGHTSQ = LIGHT_WOOD
 DARKSQ = DARK_WOOD
 
+# Most frames drawn per second
+FRAME_RATE = 60
+# Time spent handling the input and drawing each frame, and from input arriving to it being on screen
+FRAME_TIMES = Histogram('frame time')
+INPUT_LATENCY = Histogram('input to render')
+
 # Board and display variables
 BOARDSIZE = 8
 CELLSIZE = 64
@@ -486,19 +500,40 @@ DIMY = (BOARDSIZE*CELLSIZE)+(2*BUFFER)
 FILE_NAME = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
 RANK_NAME = ['1', '2', '3', '4', '5', '6', '7', '8']
 
-# Button variables
-RESET = text_objects('New Game', BUTTONFONT)
-UNDO = text_objects('coming soon', BUTTONFONT)
-QUIT = text_objects('Quit', BUTTONFONT)
-
 # Initiate players and turn variable
 TURN = 0
 PLAYER_1 = Player('w')
 PLAYER_2 = Player('b')
 
-# initiate game display
-GAME_DISPLAY = pygame.display.set_mode((DIMX, DIMY))
-pygame.display.set_caption('Chess')
 
-# Start game
-start_game()
+def main():
+    """Initiates pygame, opens the game display and starts the game"""
+    global LABELFONT, BUTTONFONT, RESET, UNDO, QUIT, GAME_DISPLAY, RENDERER, WORKER
+    # initiate pygame
+    pygame.init()
+
+    # load font
+    LABELFONT = pygame.freetype.Font(FONT, 15)
+    BUTTONFONT = pygame.font.Font(FONT, 20)
+
+    # Button variables
+    RESET = text_objects('New Game', BUTTONFONT)
+    UNDO = text_objects('Undo', BUTTONFONT)
+    QUIT = text_objects('Quit', BUTTONFONT)
+
+    # initiate game display
+    GAME_DISPLAY = pygame.display.set_mode((DIMX, DIMY))
+    pygame.display.set_caption('Chess')
+    RENDERER = Renderer(GAME_DISPLAY, CELLSIZE, BUFFER)
+    # piece images are loaded once, after the display they are converted for
+    preload()
+    # the engine thinks on its own thread and keeps its transposition table between games
+    if ENGINE is not None:
+        WORKER = EngineWorker(lambda result: pygame.event.post(pygame.event.Event(ENGINE_EVENT, result)))
+
+    # Start game
+    start_game()
+
+
+if __name__ == '__main__':
+    main()
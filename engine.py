@@ -0,0 +1,100 @@
+"""
+This file contains the engine worker.
+
+The worker runs searches and other slow requests on a thread of its own, so the game loop
+keeps drawing while the engine thinks. Each request works on its own copy of the state and
+its result is handed to a callback, which the GUI uses to post a pygame event. Starting a
+new request or cancelling stops the running one at once and its result is never handed over
+"""
+import queue
+import threading
+import traceback
+from copy import deepcopy
+from search import Search
+
+
+class EngineWorker:
+    """
+    EngineWorker class runs requests one at a time on a background thread
+    """
+    def __init__(self, post, searcher=None):
+        """
+        Init method starts the worker thread
+        Attributes:
+        post: called on the worker thread with the result of every request that was not cancelled
+        searcher: the search, its transposition table is kept between requests
+        requests: requests waiting to run
+        generation: number of the latest request, older requests are cancelled
+        lock: keeps cancelling and starting a request apart
+        """
+        self.post = post
+        self.searcher = searcher if searcher is not None else Search()
+        self.requests = queue.Queue()
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name='engine', daemon=True)
+        self.thread.start()
+
+
+    def submit(self, kind, function, state):
+        """
+        Cancels whatever is running and queues function to be called with a copy of the state
+        The result is posted as a dict with the kind, the request number, the zobrist key of
+        the state and what function returned, or the error when function raised.
+        Returns the request number
+        """
+        with self.lock:
+            self.generation += 1
+            self.searcher.cancel.set()
+            generation = self.generation
+        self.requests.put((generation, kind, function, deepcopy(state)))
+        return generation
+
+
+    def search(self, state, movetime=None, depth=None):
+        """Queues a search of the state, the result holds the best move and its score"""
+        def think(copy):
+            if depth is None:
+                move, score = self.searcher.search(copy, movetime=movetime)
+            else:
+                move, score = self.searcher.search(copy, depth, movetime)
+            return {'move': move, 'score': score}
+        return self.submit('search', think, state)
+
+
+    def cancel(self):
+        """Stops the running request and drops the queued ones, none of them are posted"""
+        with self.lock:
+            self.generation += 1
+            self.searcher.cancel.set()
+
+
+    def close(self):
+        """Cancels everything and stops the thread"""
+        self.cancel()
+        self.requests.put(None)
+        self.thread.join()
+
+
+    def run(self):
+        """Worker thread: runs the requests that are still current and posts their results"""
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            generation, kind, function, state = request
+            with self.lock:
+                if generation != self.generation:
+                    continue
+                self.searcher.cancel.clear()
+            try:
+                result = function(state)
+            except Exception as error:
+                # a request that fails is reported and the thread goes on to the next one
+                traceback.print_exc()
+                result = {'error': repr(error)}
+            with self.lock:
+                if generation != self.generation:
+                    continue
+            result.update({'kind': kind, 'request': generation, 'key': state.key})
+            self.post(result)
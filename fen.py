@@ -0,0 +1,225 @@
+"""
+This file contains FEN import and export.
+
+A FEN string describes a position in six fields: piece placement from the 8th rank down,
+side to move, castling rights, en passant target square, halfmove clock and fullmove number.
+from_fen builds a State from one without pygame, placing the pieces straight into the
+mailbox list, and to_fen writes a State back out
+"""
+from board import State
+from pieces import PIECES
+from board10x12 import MAILBOX
+from attacks import WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE
+from zobrist import PIECE_KEYS, SIDE_KEY, CASTLE_KEYS, EP_KEYS, castling_rights
+from evaluate import MG_SCORES, EG_SCORES, PHASE_WEIGHTS
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Standard perft positions and their node counts from depth 1 upwards, perft.py checks
+# move generation against them and search.py can start from any of them
+POSITIONS = {
+    'startpos': (START_FEN,
+                 [20, 400, 8902, 197281, 4865609]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                 [48, 2039, 97862, 4085603]),
+    'position3': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                  [14, 191, 2812, 43238, 674624]),
+    'position4': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                  [6, 264, 9467, 422333]),
+    'position5': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                  [44, 1486, 62379, 2103487]),
+    'position6': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                  [46, 2079, 89890, 3894594]),
+}
+
+# castling letter, king square and rook square, square index is rank*8 + file
+CASTLING = (('K', WHITE_KING_SIDE, 60, 63), ('Q', WHITE_QUEEN_SIDE, 60, 56),
+            ('k', BLACK_KING_SIDE, 4, 7), ('q', BLACK_QUEEN_SIDE, 4, 0))
+FILES = 'abcdefgh'
+# piece class, colour, letter, zobrist keys, scores and phase weight of each FEN letter,
+# and the number of empty squares of each digit
+PIECE_CHARS = {}
+for _letter, _cls in PIECES.items():
+    for _char, _colour in ((_letter, 'w'), (_letter.lower(), 'b')):
+        PIECE_CHARS[_char] = (_cls, _colour, _letter, PIECE_KEYS[_colour][_letter],
+                              MG_SCORES[_colour][_letter], EG_SCORES[_colour][_letter], PHASE_WEIGHTS[_letter])
+EMPTY = {str(_count): _count for _count in range(1, 9)}
+
+# ranks of the placement field already read, by rank number and text, see read_rank
+RANKS = {}
+# ranks kept before RANKS is emptied
+RANKS_SIZE = 4096
+
+
+def read_rank(rank, row):
+    """
+    Returns what one rank of the placement field holds: the pieces to place, each as its
+    class, colour, letter, file, mailbox index and first_move flag (None for pieces without
+    one), then the white and black occupancy, zobrist key, scores and phase they add up to.
+    Positions loaded in bulk share most of their ranks, so each is only read once
+    Raises ValueError if the rank does not hold 8 squares
+    """
+    placed = []
+    occupancy = {'w': 0, 'b': 0}
+    key = 0
+    mg_score = 0
+    eg_score = 0
+    phase = 0
+    square = rank * 8
+    end = square + 8
+    for char in row:
+        info = PIECE_CHARS.get(char)
+        if info is None:
+            if char not in EMPTY:
+                raise ValueError('bad FEN rank: ' + row)
+            square += EMPTY[char]
+            continue
+        if square >= end:
+            raise ValueError('bad FEN rank: ' + row)
+        cls, colour, letter, keys, mg_scores, eg_scores, weight = info
+        if letter == 'P':
+            # pawns can only double move from their starting rank
+            first_move = rank == (6 if colour == 'w' else 1)
+        elif letter in ('K', 'R'):
+            # kings and rooks are set again from the castling field
+            first_move = False
+        else:
+            first_move = None
+        placed.append((cls, colour, letter, square & 7, MAILBOX[square], first_move))
+        occupancy[colour] |= 1 << square
+        key ^= keys[square]
+        mg_score += mg_scores[square]
+        eg_score += eg_scores[square]
+        phase += weight
+        square += 1
+    if square != end:
+        raise ValueError('bad FEN rank: ' + row)
+    if len(RANKS) >= RANKS_SIZE:
+        RANKS.clear()
+    RANKS[rank, row] = result = (tuple(placed), occupancy['w'], occupancy['b'], key, mg_score, eg_score, phase)
+    return result
+
+
+def from_fen(fen=START_FEN):
+    """
+    Builds a state from a FEN string
+    The halfmove clock and fullmove number are optional, like in many EPD files
+    Raises ValueError if the string does not describe a position
+    The piece lists, occupancy, zobrist key and scores are added up rank by rank while the
+    pieces are placed instead of by State.refresh, which keeps loading positions in bulk fast
+    """
+    fields = fen.split()
+    if len(fields) < 4:
+        raise ValueError('FEN needs at least 4 fields: ' + fen)
+    rows = fields[0].split('/')
+    if len(rows) != 8:
+        raise ValueError('FEN placement needs 8 ranks: ' + fields[0])
+    if fields[1] not in ('w', 'b'):
+        raise ValueError('bad side to move: ' + fields[1])
+    state = State()
+    board = state.board
+    pieces = {'w': state.wpieces, 'b': state.bpieces}
+    white = 0
+    black = 0
+    key = 0
+    mg_score = 0
+    eg_score = 0
+    phase = 0
+
+    for rank, row in enumerate(rows):
+        info = RANKS.get((rank, row)) or read_rank(rank, row)
+        placed, rank_white, rank_black, rank_key, rank_mg, rank_eg, rank_phase = info
+        for cls, colour, letter, file, index, first_move in placed:
+            piece = cls(file, rank, colour)
+            if first_move is not None:
+                piece.first_move = first_move
+                if letter == 'K':
+                    if colour == 'w':
+                        state.wking = piece
+                    else:
+                        state.bking = piece
+            board[index] = piece
+            pieces[colour].append(piece)
+        white |= rank_white
+        black |= rank_black
+        key ^= rank_key
+        mg_score += rank_mg
+        eg_score += rank_eg
+        phase += rank_phase
+    if state.wking is None or state.bking is None:
+        raise ValueError('FEN needs both kings: ' + fields[0])
+
+    state.turn = fields[1]
+    if state.turn == 'b':
+        key ^= SIDE_KEY
+    if fields[2] != '-':
+        for right, _, king, rook in CASTLING:
+            if right in fields[2]:
+                kpiece = board[MAILBOX[king]]
+                rpiece = board[MAILBOX[rook]]
+                if kpiece is not None and kpiece.piece == 'K' and rpiece is not None and rpiece.piece == 'R':
+                    kpiece.first_move = True
+                    rpiece.first_move = True
+    state.castling = castling_rights(state)
+    key ^= CASTLE_KEYS[state.castling]
+
+    # the pawn that just double moved can be captured en passant
+    if fields[3] != '-':
+        file = FILES.find(fields[3][0])
+        target = (8 - int(fields[3][1])) * 8 + file if fields[3][1:].isdigit() else -1
+        if file < 0 or fields[3][1:] != ('6' if state.turn == 'w' else '3'):
+            raise ValueError('bad en passant square: ' + fields[3])
+        square = target - 8 if state.turn == 'b' else target + 8
+        origin = target + 8 if state.turn == 'b' else target - 8
+        pawn = board[MAILBOX[square]]
+        if pawn is None or pawn.piece != 'P':
+            raise ValueError('no pawn to capture en passant: ' + fields[3])
+        pawn.double = True
+        state.enpassant = True
+        squares = state.squares
+        state.last_move = (squares[origin & 7, origin >> 3], squares[square & 7, square >> 3])
+        key ^= EP_KEYS[file]
+
+    if len(fields) > 4:
+        state.halfmove = int(fields[4])
+    if len(fields) > 5:
+        state.fullmove = max(1, int(fields[5]))
+    state.occupancy = {'w': white, 'b': black}
+    state.occupied = white | black
+    state.key = key
+    state.mg_score, state.eg_score, state.phase = mg_score, eg_score, phase
+    return state
+
+
+def to_fen(state):
+    """Returns the FEN string of a state"""
+    board = state.board
+    rows = []
+    for rank in range(8):
+        row = ''
+        empty = 0
+        for file in range(8):
+            piece = board[MAILBOX[rank*8 + file]]
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += piece.piece if piece.colour == 'w' else piece.piece.lower()
+        if empty:
+            row += str(empty)
+        rows.append(row)
+
+    castling = ''.join(right for right, bit, _, _ in CASTLING if state.castling & bit) or '-'
+
+    enpassant = '-'
+    if state.enpassant and state.last_move:
+        pawn = state.last_move[1].piece
+        if pawn is not None and pawn.piece == 'P' and pawn.double:
+            # the square the pawn passed over
+            rank = pawn.rank - 1 if pawn.colour == 'b' else pawn.rank + 1
+            enpassant = FILES[pawn.file] + str(8 - rank)
+
+    return '%s %s %s %s %d %d' % ('/'.join(rows), state.turn, castling, enpassant,
+                                  state.halfmove, state.fullmove)
@@ -0,0 +1,117 @@
+"""
+This file contains the game history.
+
+The game is kept as a log of move integers (see moves.py) together with the undo records of
+the moves behind the current position, so undo and redo are a single unmake_move or make_move.
+Every few plies a copy of the state is kept as a snapshot, jumping to a ply far away starts
+from the closest snapshot instead of replaying the whole game
+"""
+from array import array
+from copy import deepcopy
+
+# plies between two snapshots
+SNAPSHOT_INTERVAL = 16
+
+
+class History:
+    """
+    History class holds the moves of a game and moves the state back and forth through them
+    """
+    def __init__(self, state, interval=SNAPSHOT_INTERVAL):
+        """
+        Init method starts an empty game from the state
+        Attributes:
+        state: the state at the current ply, replaced when a snapshot is restored
+        moves: every move of the game, including the ones after the current ply after an undo
+        undos: undo records of the moves from the last restored snapshot up to the current ply
+        ply: number of moves played to reach the current position
+        interval: plies between two snapshots
+        snapshots: copies of the state by ply
+        """
+        self.interval = interval
+        self.reset(state)
+
+
+    def reset(self, state):
+        """Starts the history over from the state"""
+        self.state = state
+        self.moves = array('L')
+        self.undos = []
+        self.ply = 0
+        self.snapshots = {0: deepcopy(state)}
+
+
+    def __len__(self):
+        return len(self.moves)
+
+
+    def push(self, move):
+        """
+        Plays a new move from the current ply
+        Moves that were undone are dropped, the game continues from here
+        """
+        if self.ply < len(self.moves):
+            del self.moves[self.ply:]
+            for ply in [ply for ply in self.snapshots if ply > self.ply]:
+                del self.snapshots[ply]
+        self.moves.append(move)
+        self.redo()
+        return self.state
+
+
+    def undo(self):
+        """Takes back the last move, returns it or None at the start of the game"""
+        if self.ply == 0:
+            return None
+        move = self.moves[self.ply-1]
+        if self.undos:
+            self.state.unmake_move(self.undos.pop())
+            self.ply -= 1
+        else:
+            # the undo records start at the snapshot the state came from
+            self.restore(self.ply-1)
+        return move
+
+
+    def redo(self):
+        """Plays the next move of the log again, returns it or None at the end of the log"""
+        if self.ply == len(self.moves):
+            return None
+        move = self.moves[self.ply]
+        self.undos.append(self.state.make_move(move))
+        self.ply += 1
+        if self.ply % self.interval == 0 and self.ply not in self.snapshots:
+            self.snapshots[self.ply] = deepcopy(self.state)
+        return move
+
+
+    def restore(self, ply):
+        """Replaces the state with a copy of the closest snapshot before ply and replays up to it"""
+        base = max(snapshot for snapshot in self.snapshots if snapshot <= ply)
+        self.state = deepcopy(self.snapshots[base])
+        self.undos = []
+        self.ply = base
+        while self.ply < ply:
+            self.redo()
+
+
+    def jump(self, ply):
+        """
+        Moves the state to the position after ply moves
+        Steps through the undo records when that is shorter than replaying from a snapshot
+        Returns the state, which is a new object when a snapshot was restored
+        """
+        ply = max(0, min(ply, len(self.moves)))
+        snapshot = max(snapshot for snapshot in self.snapshots if snapshot <= ply)
+        if ply <= self.ply:
+            if self.ply - ply <= len(self.undos) and self.ply - ply <= ply - snapshot:
+                while self.ply > ply:
+                    self.undo()
+            else:
+                self.restore(ply)
+        elif snapshot > self.ply:
+            self.restore(ply)
+        else:
+            while self.ply < ply:
+                self.redo()
+        return self.state
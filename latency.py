@@ -0,0 +1,70 @@
+"""
+This file contains the latency histogram.
+
+Times are counted in buckets that double in size from a millisecond up, which is enough to
+see whether frames stay under the frame budget without keeping every sample
+"""
+
+# upper edge of each bucket in milliseconds, the last bucket holds everything slower
+EDGES = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class Histogram:
+    """
+    Histogram class counts durations by bucket and keeps their total and maximum
+    """
+    def __init__(self, name):
+        """
+        Init method instantiates an empty histogram
+        Attributes:
+        name: what is timed, printed with the report
+        counts: number of samples in each bucket, one more than there are edges
+        total: sum of all samples in seconds
+        longest: slowest sample in seconds
+        """
+        self.name = name
+        self.counts = [0] * (len(EDGES) + 1)
+        self.total = 0.0
+        self.longest = 0.0
+
+
+    def __len__(self):
+        return sum(self.counts)
+
+
+    def record(self, seconds):
+        """Counts one duration in seconds"""
+        milliseconds = seconds * 1000
+        bucket = 0
+        while bucket < len(EDGES) and milliseconds >= EDGES[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.total += seconds
+        if seconds > self.longest:
+            self.longest = seconds
+
+
+    def percentile(self, fraction):
+        """Returns the upper edge in milliseconds of the bucket holding the given fraction of samples"""
+        wanted = fraction * len(self)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return EDGES[bucket] if bucket < len(EDGES) else round(self.longest * 1000, 2)
+        return 0
+
+
+    def report(self):
+        """Returns the histogram as lines of text"""
+        samples = len(self)
+        lines = ['{}: {} samples, mean {:.2f} ms, p50 < {} ms, p99 < {} ms, max {:.2f} ms'.format(
+            self.name, samples, self.total * 1000 / max(samples, 1), self.percentile(0.5),
+            self.percentile(0.99), self.longest * 1000)]
+        lower = 0
+        for bucket, count in enumerate(self.counts):
+            upper = '{:>4} ms'.format(EDGES[bucket]) if bucket < len(EDGES) else '   inf'
+            if count:
+                lines.append('  {:>4} - {}: {:>7} {}'.format(lower, upper, count, '#' * max(1, count * 40 // samples)))
+            lower = EDGES[bucket] if bucket < len(EDGES) else lower
+        return lines
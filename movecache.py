@@ -0,0 +1,79 @@
+"""
+This file contains the legal move cache.
+
+The GUI asks for the legal moves of the same position several times per move: to light up
+the squares a piece can reach, to check the clicked move and to look for mate afterwards.
+The cache keeps the legal moves of the last few positions by zobrist key, dropping the
+least recently used position when it is full
+"""
+from collections import OrderedDict
+
+# positions kept
+CACHE_SIZE = 256
+
+
+class MoveCache:
+    """
+    MoveCache class keeps the legal moves of the most recently used positions
+    """
+    def __init__(self, size=CACHE_SIZE):
+        """
+        Init method instantiates an empty cache
+        Attributes:
+        size: most positions kept
+        entries: tuple of legal moves by key, least recently used first
+        hits, misses, evictions: statistics
+        """
+        self.size = size
+        self.entries = OrderedDict()
+        self.reset_stats()
+
+
+    def reset_stats(self):
+        """Sets all statistics back to zero"""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def clear(self):
+        """Empties the cache"""
+        self.entries.clear()
+        self.reset_stats()
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def get(self, key):
+        """Returns the moves stored for key, or None if the position is not cached"""
+        moves = self.entries.get(key)
+        if moves is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return moves
+
+
+    def put(self, key, moves):
+        """Stores the moves of a position, dropping the least recently used one when full"""
+        self.entries[key] = moves
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+
+    def stats(self):
+        """Returns the statistics with the hit rate"""
+        lookups = max(self.hits + self.misses, 1)
+        return {
+            'entries': len(self.entries),
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,36 @@
+"""
+This file contains the move encoding.
+
+A move is a small integer: origin square, target square, flag and promotion piece.
+Squares are rank*8 + file, so a8 is 0 and h1 is 63
+    bits 0-5: origin, bits 6-11: target, bits 12-15: flag, bits 16-18: promotion piece type
+"""
+
+# move flags
+QUIET = 0
+CAPTURE = 1
+DOUBLE = 2
+ENPASSANT = 3
+CASTLE = 4
+
+# piece types, also the promotion field (0, a pawn, means no promotion)
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+SYMBOLS = 'PNBRQK'
+# promotions in the order they are generated, the queen first
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+
+def encode_move(start, end, flag=QUIET, promotion=0):
+    """Packs a move into an integer: start, end, flag and promotion piece type"""
+    return start | (end << 6) | (flag << 12) | (promotion << 16)
+
+
+def move_name(move):
+    """Returns the name of an encoded move, e.g. e7e8q"""
+    start = move & 63
+    end = (move >> 6) & 63
+    name = 'abcdefgh'[start & 7] + str(8 - (start >> 3)) + 'abcdefgh'[end & 7] + str(8 - (end >> 3))
+    promotion = move >> 16
+    if promotion:
+        name += SYMBOLS[promotion].lower()
+    return name
@@ -0,0 +1,121 @@
+"""
+This file contains the move ordering.
+
+Alpha-beta cuts off sooner when the best move is searched first, so moves are sorted by:
+the hash move, captures by most valuable victim and least valuable attacker (MVV-LVA),
+the killer moves of the ply, and then quiet moves by their history score
+"""
+from board10x12 import MAILBOX
+from moves import CAPTURE, ENPASSANT, QUEEN
+
+# MVV-LVA order of the pieces, least valuable first
+ORDER = 'PNBRQK'
+
+HASH_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 29
+KILLER_SCORES = (1 << 28, (1 << 28) - 1)
+# history scores are halved when they pass this so they stay below the killers
+HISTORY_LIMIT = 1 << 20
+# deepest ply of a search, search.py uses this one so the killer table always covers every ply
+MAX_PLY = 64
+
+
+class MoveOrderer:
+    """
+    MoveOrderer class sorts moves so the ones most likely to cause a cutoff come first
+    """
+    def __init__(self):
+        """
+        Init method instantiates the move orderer
+        Attributes:
+        killers: the last two quiet moves that caused a cutoff, per ply
+        history: how often each quiet move caused a cutoff, weighted by depth, by origin and target square
+        cutoffs: number of cutoffs
+        first_cutoffs: number of cutoffs caused by the first move searched
+        """
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [0] * 4096
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+
+
+    def clear(self):
+        """Forgets the killers, history and statistics"""
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [0] * 4096
+        self.reset_stats()
+
+
+    def reset_stats(self):
+        """Sets the cutoff statistics back to zero"""
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+
+
+    def new_search(self):
+        """Keeps the history of earlier searches but lets the new one outweigh it"""
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [score >> 1 for score in self.history]
+        self.reset_stats()
+
+
+    def score(self, state, move, ply, hash_move=None):
+        """Returns the ordering score of a move, higher is searched first"""
+        if move == hash_move:
+            return HASH_SCORE
+        flag = (move >> 12) & 15
+        promotion = move >> 16
+        if flag == CAPTURE:
+            victim = state.board[MAILBOX[(move >> 6) & 63]].piece
+            attacker = state.board[MAILBOX[move & 63]].piece
+            return CAPTURE_SCORE + ORDER.index(victim) * 8 - ORDER.index(attacker) + promotion * 8
+        if flag == ENPASSANT:
+            return CAPTURE_SCORE
+        # promoting to a queen is searched with the captures, underpromotions come last
+        if promotion == QUEEN:
+            return CAPTURE_SCORE + promotion * 8
+        if promotion:
+            return -1
+        killers = self.killers[ply]
+        if move == killers[0]:
+            return KILLER_SCORES[0]
+        if move == killers[1]:
+            return KILLER_SCORES[1]
+        return self.history[move & 4095]
+
+
+    def order(self, state, moves, ply, hash_move=None):
+        """Sorts the moves in place best first and returns them"""
+        moves.sort(key=lambda move: self.score(state, move, ply, hash_move), reverse=True)
+        return moves
+
+
+    def cutoff(self, move, ply, depth, searched):
+        """
+        Records a move that caused a cutoff
+        searched: number of moves searched before it
+        Quiet moves become killers of the ply and gain history
+        """
+        self.cutoffs += 1
+        if searched == 0:
+            self.first_cutoffs += 1
+        if (move >> 12) & 15 in (CAPTURE, ENPASSANT) or move >> 16:
+            return
+        killers = self.killers[ply]
+        if move != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = move
+        # the origin and target squares are the low 12 bits of the move
+        index = move & 4095
+        self.history[index] += depth * depth
+        if self.history[index] > HISTORY_LIMIT:
+            self.history = [score >> 1 for score in self.history]
+
+
+    def stats(self):
+        """Returns the cutoff statistics with the share of cutoffs caused by the first move"""
+        return {
+            'cutoffs': self.cutoffs,
+            'first_cutoffs': self.first_cutoffs,
+            'first_cutoff_rate': self.first_cutoffs / max(self.cutoffs, 1),
+        }
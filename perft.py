@@ -0,0 +1,119 @@
+"""
+This file contains the perft tool.
+
+Perft walks the tree of legal moves to a fixed depth and counts the leaf nodes.
+The counts are compared against known results to check move generation, and the
+time taken gives the speed of legal move generation in nodes per second
+"""
+import argparse
+import time
+from fen import from_fen, POSITIONS
+from moves import move_name
+
+
+def perft(state, depth):
+    """Returns the number of leaf nodes of the legal move tree at depth"""
+    if depth == 0:
+        return 1
+    moves = state.generate_legal()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = state.make_move(move)
+        nodes += perft(state, depth-1)
+        state.unmake_move(undo)
+    return nodes
+
+
+def divide(state, depth):
+    """Returns the perft count below each legal move, keyed by the move name"""
+    counts = {}
+    for move in state.generate_legal():
+        undo = state.make_move(move)
+        counts[move_name(move)] = perft(state, depth-1)
+        state.unmake_move(undo)
+    return counts
+
+
+def hash_perft(state, depth, table=None):
+    """
+    Perft that stores the count of every subtree it finishes
+    Transpositions reached again at the same depth reuse the stored count
+    """
+    if table is None:
+        table = {}
+    if depth <= 1:
+        return perft(state, depth)
+    key = (state.key, depth)
+    if key in table:
+        return table[key]
+    nodes = 0
+    for move in state.generate_legal():
+        undo = state.make_move(move)
+        nodes += hash_perft(state, depth-1, table)
+        state.unmake_move(undo)
+    table[key] = nodes
+    return nodes
+
+
+def timed(function, state, depth):
+    """Runs a perft function and returns the nodes, seconds taken and nodes per second"""
+    start = time.perf_counter()
+    nodes = function(state, depth)
+    elapsed = time.perf_counter() - start
+    nps = nodes / elapsed if elapsed > 0 else 0
+    return nodes, elapsed, nps
+
+
+def check(depth, function=perft):
+    """Runs every reference position up to depth and reports any mismatch"""
+    passed = True
+    for name in POSITIONS:
+        fen, expected = POSITIONS[name]
+        state = from_fen(fen)
+        for current in range(1, min(depth, len(expected))+1):
+            nodes, elapsed, nps = timed(function, state, current)
+            result = 'ok' if nodes == expected[current-1] else 'FAIL'
+            if result == 'FAIL':
+                passed = False
+            print('%-10s depth %d: %10d nodes (expected %d) %8.2fs %9.0f nps %s'
+                  % (name, current, nodes, expected[current-1], elapsed, nps, result))
+    return passed
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Count legal move tree nodes')
+    parser.add_argument('-d', '--depth', type=int, default=3, help='search depth')
+    parser.add_argument('--fen', help='position to search')
+    parser.add_argument('--position', choices=sorted(POSITIONS), default='startpos',
+                        help='reference position to search when no FEN is given')
+    parser.add_argument('--divide', action='store_true', help='print the count below each move')
+    parser.add_argument('--hash', action='store_true', help='reuse counts of transposed subtrees')
+    parser.add_argument('--check', action='store_true',
+                        help='run all reference positions up to depth and compare the counts')
+    args = parser.parse_args()
+
+    function = hash_perft if args.hash else perft
+    if args.check:
+        return 0 if check(args.depth, function) else 1
+
+    fen = args.fen if args.fen else POSITIONS[args.position][0]
+    state = from_fen(fen)
+    if args.divide:
+        start = time.perf_counter()
+        counts = divide(state, args.depth)
+        for name in sorted(counts):
+            print(name + ':', counts[name])
+        nodes = sum(counts.values())
+        elapsed = time.perf_counter() - start
+        nps = nodes / elapsed if elapsed > 0 else 0
+    else:
+        nodes, elapsed, nps = timed(function, state, args.depth)
+    print('depth %d: %d nodes in %.2fs (%.0f nps)' % (args.depth, nodes, elapsed, nps))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -3,777 +3,262 @@ This file contains the piece class (abstract)
 
 Since each piece has differnt movement rules, they each have their own class
 """
+import os
 from abc import ABC, abstractmethod
+from attacks import rook_attacks, bishop_attacks, queen_attacks
+from board10x12 import OFF, MAILBOX, SQUARES, KNIGHT_STEPS, KING_STEPS
+from moves import CAPTURE, DOUBLE, ENPASSANT, CASTLE, PROMOTIONS
+
+# Image of each piece by colour and letter, shared by all pieces instead of kept on each one
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'png')
+IMAGES = {
+    colour: {letter: os.path.join(IMAGE_DIR, name + colour + '.png')
+             for letter, name in (('P', 'pawn'), ('R', 'rook'), ('N', 'knight'),
+                                  ('B', 'bishop'), ('Q', 'queen'), ('K', 'king'))}
+    for colour in ('w', 'b')
+}
 
 class Piece(ABC):
     """
     An abstract class that reprsents pieces
+    Pieces only hold what changes during a game in slots, the letter is a class attribute
+    and the image is looked up in IMAGES. Subclasses set file, rank and colour themselves
+    instead of calling super().__init__, which was a good part of the cost of loading a FEN
     """
-    def __init__(self, file, rank, colour, piece=None):
+    __slots__ = ('file', 'rank', 'colour')
+    piece = None
+
+    def __init__(self, file, rank, colour):
         """
         Init method that instantiates a piece ojbect
         atributes:
-        file, rank, colour, piece
+        file, rank, colour
         """
         self.file = file
         self.rank = rank
         self.colour = colour
-        self.piece = piece
+
+    @property
+    def img(self):
+        """Path of the image of the piece"""
+        return IMAGES[self.colour][self.piece]
+
+    def __deepcopy__(self, memo):
+        """Copies the slots directly, they only hold numbers, letters and flags"""
+        clone = object.__new__(type(self))
+        memo[id(self)] = clone
+        clone.file = self.file
+        clone.rank = self.rank
+        clone.colour = self.colour
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name))
+        return clone
 
     def move_to(self, new_file, new_rank):
         """Method that changes the file and rank of a piece object"""
         self.file = new_file
         self.rank = new_rank
 
-    @abstractmethod
     def valid_moves(self, state):
-        """Abstract method that returns all valid moves"""
+        """Returns all valid moves as encoded integers, see moves.py"""
+        moves = []
+        self.generate(state, moves)
+        return moves
+
+    @abstractmethod
+    def generate(self, state, moves):
+        """Abstract method that appends all valid moves to the moves list"""
         return
 
+    def step_moves(self, state, steps, moves):
+        """
+        Appends the moves of a knight or king: one step in each direction on the mailbox board
+        Steps off the board land on a sentinel, empty squares are moves and enemy pieces captures
+        """
+        board = state.board
+        start = self.rank*8 + self.file
+        index = MAILBOX[start]
+        for step in steps:
+            target = board[index+step]
+            if target is None:
+                moves.append(start | (SQUARES[index+step] << 6))
+            elif target is not OFF and target.colour != self.colour:
+                moves.append(start | (SQUARES[index+step] << 6) | (CAPTURE << 12))
+
+    def slider_moves(self, state, attacks, moves):
+        """
+        Appends the moves of a sliding piece from its attack set
+        Squares of friendly pieces are dropped and squares of enemy pieces are captures
+        """
+        start = self.rank*8 + self.file
+        enemy = state.occupancy['b' if self.colour == 'w' else 'w']
+        attacks &= ~state.occupancy[self.colour]
+        while attacks:
+            low = attacks & -attacks
+            attacks ^= low
+            if low & enemy:
+                moves.append(start | ((low.bit_length() - 1) << 6) | (CAPTURE << 12))
+            else:
+                moves.append(start | ((low.bit_length() - 1) << 6))
+
 
 class Pawn(Piece):
     """Pawn Class"""
+    __slots__ = ('first_move', 'double')
+    piece = 'P'
+
     def __init__(self, file, rank, colour):
         """
         init method initializes pawn object
         atributes:
-        img
         first_move
         double
         """
-        super().__init__(file, rank, colour)
-        self.piece = 'P'
-        if colour == 'b':
-            self.img = '/home/johnx/Projects/chess/png/pawnb.png'
-        elif colour == 'w':
-            self.img = '/home/johnx/Projects/chess/png/pawnw.png'
+        self.file = file
+        self.rank = rank
+        self.colour = colour
         self.first_move = True
         self.double = False
 
-    def valid_moves(self, state):
+    def generate(self, state, moves):
         """
-        Returns all valid moves for the pawn piece
+        Appends all valid moves for the pawn piece, a move to the last rank is one move per promotion piece
         """
-        file = self.file
-        rank = self.rank
-        current_state = state.squares
-        file_left = file - 1
-        file_right = file + 1
-        moves = []
+        board = state.board
+        start = self.rank*8 + self.file
+        index = MAILBOX[start]
+        # White pawns go up the board and black pawns go down
+        step = -10 if self.colour == 'w' else 10
+        last = self.rank + (-1 if self.colour == 'w' else 1) in (0, 7)
+        targets = []
 
-        # Black
-        if self.colour == 'b':
-            # Moves
-            # Pawn can normally only move one space up
-            if current_state[file, rank+1].piece is None:
-                moves.append((file, rank+1))
-                # first move can move two spaces up
-                if self.first_move and current_state[file, rank+2].piece is None:
-                    moves.append((file, rank+2, 'D'))
-            # Capture
-            if file-1 < 0:
-                leftsq = None
-                rightsq = current_state[file+1, rank+1].piece
-            elif file+1 > 7:
-                leftsq = current_state[file-1, rank+1].piece
-                rightsq = None
+        # Moves
+        # Pawn can normally only move one space up
+        if board[index+step] is None:
+            targets.append(SQUARES[index+step] << 6)
+            # first move can move two spaces up
+            if self.first_move and board[index+2*step] is None:
+                moves.append(start | (SQUARES[index+2*step] << 6) | (DOUBLE << 12))
+        # Capture
+        for side in (-1, 1):
+            target = board[index+step+side]
+            if target is OFF:
+                continue
+            if target is not None:
+                if target.colour != self.colour:
+                    targets.append((SQUARES[index+step+side] << 6) | (CAPTURE << 12))
             else:
-                leftsq = current_state[file-1, rank+1].piece
-                rightsq = current_state[file+1, rank+1].piece
-            # Append Moves
-            if leftsq is not None and leftsq.colour != self.colour:
-                moves.append((file-1, rank+1, 'X'))
-            if rightsq is not None and rightsq.colour != self.colour:
-                moves.append((file+1, rank+1, 'X'))
-            # En Passant
-            if file_left in range(0, 8):
-                left = current_state[file_left, rank].piece
-                if left is not None and left.piece == 'P' and left.colour != self.colour and left.double:
-                    moves.append((file-1, rank+1, 'E'))
-            if file_right in range(0, 8):
-                right = current_state[file_right, rank].piece
-                if right is not None and right.piece == 'P' and right.colour != self.colour and right.double:
-                    moves.append((file+1, rank+1, 'E'))
-        elif self.colour == 'w': # White
-            # Moves
-            # Pawn can normally only move one space up
-            if current_state[file, rank-1].piece is None:
-                moves.append((file, rank-1))
-                # first move can move two spaces up
-                if self.first_move and current_state[file, rank-2].piece is None:
-                    moves.append((file, rank-2, 'D'))
-            # Capture
-            if file-1 < 0:
-                leftsq = None
-                rightsq = current_state[file+1, rank-1].piece
-            elif file+1 > 7:
-                leftsq = current_state[file-1, rank-1].piece
-                rightsq = None
+                # En Passant: the pawn beside has just moved two spaces
+                beside = board[index+side]
+                if beside is not None and beside.piece == 'P' and beside.double and beside.colour != self.colour:
+                    moves.append(start | (SQUARES[index+step+side] << 6) | (ENPASSANT << 12))
+        for target in targets:
+            if last:
+                for promotion in PROMOTIONS:
+                    moves.append(start | target | (promotion << 16))
             else:
-                leftsq = current_state[file-1, rank-1].piece
-                rightsq = current_state[file+1, rank-1].piece
-            # Append moves
-            if leftsq is not None and leftsq.colour != self.colour:
-                moves.append((file-1, rank-1, 'X'))
-            if rightsq is not None and rightsq.colour != self.colour:
-                moves.append((file+1, rank-1, 'X'))
-            # En Passant
-            if file_left in range(0, 8):
-                left = current_state[file_left, rank].piece
-                if left is not None and left.piece == 'P' and left.double and left.colour != self.colour:
-                    moves.append((file-1, rank-1, 'E'))
-            if file_right in range(0, 8):
-                right = current_state[file_right, rank].piece
-                if right is not None and right.piece == 'P' and right.double and right.colour != self.colour:
-                    moves.append((file+1, rank-1, 'E'))
-        return moves
+                moves.append(start | target)
 
 
 class Rook(Piece):
     """Rook Class"""
+    __slots__ = ('first_move',)
+    piece = 'R'
+
     def __init__(self, file, rank, colour):
         """
         init method instantiates rook object
         atributes:
-        img
         first_move
         """
-        super().__init__(file, rank, colour)
-        self.piece = 'R'
-        if colour == 'b':
-            self.img = '/home/johnx/Projects/chess/png/rookb.png'
-        elif colour == 'w':
-            self.img = '/home/johnx/Projects/chess/png/rookw.png'
+        self.file = file
+        self.rank = rank
+        self.colour = colour
         self.first_move = True
 
-    def valid_moves(self, state):
+    def generate(self, state, moves):
         """
-        Method returns all valid moves for the rook piece
+        Method appends all valid moves for the rook piece
         """
-        file = self.file
-        rank = self.rank
-        current_state = state.squares
-        moves = []
-
-        # Keeps track of how many squares away we're looking at
-        distance = 1
-        # Counts which side we're checking
-        sides = 0
-
-        while sides < 4:
-            # North
-            if sides == 0:
-                sel_file = file
-                sel_rank = rank - distance
-                # check if out of bounds
-                if sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # South
-            if sides == 1:
-                sel_file = file
-                sel_rank = rank + distance
-                if sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                # if square contains a piece, check if ally
-                elif selectedsq.piece is not None:
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # West
-            if sides == 2:
-                sel_file = file - distance
-                sel_rank = rank
-                if sel_file in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                # if square contains a piece, check if ally
-                elif selectedsq.piece is not None:
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # East
-            if sides == 3:
-                sel_file = file + distance
-                sel_rank = rank
-                if sel_file in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:       # if square contains a piece, check if ally
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-        return moves
+        self.slider_moves(state, rook_attacks(self.rank*8 + self.file, state.occupied), moves)
 
 
 class Knight(Piece):
     """Knight Class"""
-    def __init__(self, file, rank, colour):
-        """
-        init method instantiates knight object
-        atribute:
-        img
-        """
-        super().__init__(file, rank, colour)
-        self.piece = 'N'
-        if colour == 'b':
-            self.img = '/home/johnx/Projects/chess/png/knightb.png'
-        elif colour == 'w':
-            self.img = '/home/johnx/Projects/chess/png/knightw.png'
+    __slots__ = ()
+    piece = 'N'
 
-    def valid_moves(self, state):
+    def generate(self, state, moves):
         """
-        Returns all valid moves for Knight piece
+        Appends all valid moves for Knight piece
         """
-        current_state = state.squares
-        j_order = [-2, -1, 1, 2]
-        i_order = [1, 2, 2, 1]
-        moves = []
-
-        for index, j in enumerate(j_order):
-            sel_file = self.file + j
-            rank_left = self.rank - i_order[index]
-            rank_right = self.rank + i_order[index]
-
-            if sel_file in range(0, 8) and rank_left in range(0, 8):
-                leftsq = current_state[sel_file, rank_left]
-                if leftsq.piece is None:
-                    moves.append((sel_file, rank_left))
-                # capture
-                elif leftsq.piece.colour != self.colour:
-                    moves.append((sel_file, rank_left, 'X'))
-            if sel_file in range(0, 8) and rank_right in range(0, 8):
-                rightsq = current_state[sel_file, rank_right]
-                if rightsq.piece is None:
-                    moves.append((sel_file, rank_right))
-                # capture
-                elif rightsq.piece.colour != self.colour:
-                    moves.append((sel_file, rank_right, 'X'))
-        return moves
+        self.step_moves(state, KNIGHT_STEPS, moves)
 
 
 class Bishop(Piece):
     """Bishop Class"""
-    def __init__(self, file, rank, colour):
-        """
-        init method instantiates Bishop object
-        atributes:
-        img
-        """
-        super().__init__(file, rank, colour)
-        self.piece = 'B'
-        if colour == 'b':
-            self.img = '/home/johnx/Projects/chess/png/bishopb.png'
-        elif colour == 'w':
-            self.img = '/home/johnx/Projects/chess/png/bishopw.png'
+    __slots__ = ()
+    piece = 'B'
 
-    def valid_moves(self, state):
-        """Returns all valid moves for bishop piece"""
-        current_state = state.squares
-        moves = []
-        # Keeps track of how many squares away we're looking at
-        distance = 1
-        # Counts which side we're checking
-        sides = 0
-
-        while sides < 4:
-            # NW
-            if sides == 0:
-                sel_file = self.file - distance
-                sel_rank = self.rank - distance
-                # check if out of bounds
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # SE
-            if sides == 1:
-                sel_file = self.file + distance
-                sel_rank = self.rank + distance
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:       #if square contains a piece, check if ally
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # SW
-            if sides == 2:
-                sel_file = self.file - distance
-                sel_rank = self.rank + distance
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:       # if square contains a piece, check if ally
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # NE
-            if sides == 3:
-                sel_file = self.file + distance
-                sel_rank = self.rank - distance
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                # if square contains a piece, check if ally
-                elif selectedsq.piece is not None:
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-        return moves
+    def generate(self, state, moves):
+        """Appends all valid moves for bishop piece"""
+        self.slider_moves(state, bishop_attacks(self.rank*8 + self.file, state.occupied), moves)
 
 
 class Queen(Piece):
     """Queen Class"""
-    def __init__(self, file, rank, colour):
-        """
-        init method instantiates a Queen object
-        atribute:
-        img
-        """
-        super().__init__(file, rank, colour)
-        self.piece = 'Q'
-        if colour == 'b':
-            self.img = '/home/johnx/Projects/chess/png/queenb.png'
-        elif colour == 'w':
-            self.img = '/home/johnx/Projects/chess/png/queenw.png'
+    __slots__ = ()
+    piece = 'Q'
 
-    def valid_moves(self, state):
+    def generate(self, state, moves):
         """
-        Return all valid moves for Queen piece
-        note: might be more efficient way. Current while loop checks each side one square at a time
+        Appends all valid moves for Queen piece
         """
-        file = self.file
-        rank = self.rank
-        current_state = state.squares
-        moves = []
-
-        # Keeps track of how many squares away we're looking at
-        distance = 1
-        # Counts which side we're checking
-        sides = 0
-
-        while sides < 8:
-            # North
-            if sides == 0:
-                sel_file = file
-                sel_rank = rank - distance
-                # check if out of bounds
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # South
-            if sides == 1:
-                sel_file = file
-                sel_rank = rank + distance
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[file, rank+distance]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:       # if square contains a piece, check if ally
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # West
-            if sides == 2:
-                sel_file = file - distance
-                sel_rank = rank
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:       # if square contains a piece, check if ally
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # East
-            if sides == 3:
-                sel_file = file + distance
-                sel_rank = rank
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:       # if square contains a piece, check if ally
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # NW
-            if sides == 4:
-                sel_file = file - distance
-                sel_rank = rank - distance
-                # check if out of bounds
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # SE
-            if sides == 5:
-                sel_file = file + distance
-                sel_rank = rank + distance
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:       # if square contains a piece, check if ally
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # SW
-            if sides == 6:
-                sel_file = file - distance
-                sel_rank = rank + distance
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:       # if square contains a piece, check if ally
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-            # NE
-            if sides == 7:
-                sel_file = file + distance
-                sel_rank = rank - distance
-                if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                    selectedsq = current_state[sel_file, sel_rank]
-                else:
-                    distance = 1
-                    sides += 1
-                    continue
-
-                # if the square is empty, then append to possible moves
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                    distance += 1
-                    continue
-                elif selectedsq.piece is not None:       # if square contains a piece, check if ally
-                    if self.colour == selectedsq.piece.colour:
-                        distance = 1
-                        sides += 1
-                        continue
-                    else: # Capture
-                        moves.append((sel_file, sel_rank, 'X'))
-                        distance = 1
-                        sides += 1
-                        continue
-        return moves
+        self.slider_moves(state, queen_attacks(self.rank*8 + self.file, state.occupied), moves)
 
 
 class King(Piece):
     """King Class"""
+    __slots__ = ('checked', 'first_move')
+    piece = 'K'
+
     def __init__(self, file, rank, colour):
         """
         init method instantiates King object
         atributes:
-        img
-        check
+        checked
         first_move
         """
-        super().__init__(file, rank, colour)
-        self.piece = 'K'
-        if colour == 'b':
-            self.img = '/home/johnx/Projects/chess/png/kingb.png'
-        elif colour == 'w':
-            self.img = '/home/johnx/Projects/chess/png/kingw.png'
+        self.file = file
+        self.rank = rank
+        self.colour = colour
         self.checked = False
         self.first_move = True
 
-    def valid_moves(self, state):
+    def generate(self, state, moves):
         """
-        returns all valid moves for King piece
+        appends all valid moves for King piece
         """
-        k_file = self.file + 3
-        q_file = self.file - 4
-        current_state = state.squares
-        # The move to consider is (jorder, iorder)
-        j_order = [-1, -1, -1, 0, 0, 1, 1, 1]
-        i_order = [0, 1, -1, 1, -1, 0, 1, -1]
-        moves = []
-
-        # Castling
-        if self.first_move and not self.checked:
-            try:
-                king_side = current_state[k_file, self.rank].piece
-            except KeyError:
-                king_side = None
-            try:
-                queen_side = current_state[q_file, self.rank].piece
-            except KeyError:
-                queen_side = None
-
-            if king_side is not None and king_side.piece == 'R' and king_side.first_move:
-                clear = False
-                sel_file = k_file - 1
-                # check if squares between king and ks rook are empty and not attacked
-                while sel_file != self.file:
-                    if current_state[sel_file, self.rank].piece is None:
-                        sel_file -= 1
-                        clear = True
-                        continue
-                    else:
-                        sel_file = self.file
-                        clear = False
-                        continue
-                if clear: # can castle
-                    moves.append((self.file+2, self.rank, 'C'))
-            if queen_side is not None and queen_side.piece == 'R' and queen_side.first_move:
-                clear = False
-                sel_file = q_file + 1
-                # check if squares between king and qs rook are empty
-                while sel_file != self.file:
-                    if current_state[sel_file, self.rank].piece is None:
-                        sel_file += 1
-                        clear = True
-                        continue
-                    else:
-                        sel_file = self.file
-                        clear = False
-                        continue
-                if clear: # can castle
-                    moves.append((self.file-2, self.rank, 'C'))
+        board = state.board
+        start = self.rank*8 + self.file
+        index = MAILBOX[start]
+
+        # Castling: the king being in check or passing through an attacked square is checked by the state
+        if self.first_move:
+            king_side = board[index+3]
+            queen_side = board[index-4]
+            # squares between king and ks rook must be empty, a sentinel is never a rook
+            if (king_side is not None and king_side is not OFF and king_side.piece == 'R' and king_side.first_move
+                    and board[index+1] is None and board[index+2] is None):
+                moves.append(start | ((start+2) << 6) | (CASTLE << 12))
+            # squares between king and qs rook must be empty
+            if (queen_side is not None and queen_side is not OFF and queen_side.piece == 'R' and queen_side.first_move
+                    and board[index-1] is None and board[index-2] is None and board[index-3] is None):
+                moves.append(start | ((start-2) << 6) | (CASTLE << 12))
 
         # Moves
-        for index, j in enumerate(j_order):
-            sel_file = self.file + j
-            sel_rank = self.rank + i_order[index]
-
-            if sel_file in range(0, 8) and sel_rank in range(0, 8):
-                selectedsq = current_state[sel_file, sel_rank]
-                if selectedsq.piece is None:
-                    moves.append((sel_file, sel_rank))
-                # Capture
-                elif selectedsq.piece.colour != self.colour:
-                    moves.append((sel_file, sel_rank, 'X'))
-        return moves
+        self.step_moves(state, KING_STEPS, moves)
+
+
+# Piece classes by their letter
+PIECES = {'P': Pawn, 'R': Rook, 'N': Knight, 'B': Bishop, 'Q': Queen, 'K': King}
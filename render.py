@@ -0,0 +1,134 @@
+"""
+This file contains the renderer.
+
+The renderer remembers what it drew on every square (the piece and the highlight colour) and
+only redraws a square when that changes. The rectangles it redraws are collected and handed
+to pygame.display.update at the end of the frame, so a frame where nothing changed costs nothing
+"""
+import pygame
+from sprites import sprite
+from moves import ENPASSANT, CASTLE
+
+
+class Renderer:
+    """
+    Renderer class draws the squares of the board that changed since the last frame
+    """
+    def __init__(self, display, cellsize, buffer):
+        """
+        Init method instantiates the renderer
+        Attributes:
+        display: the game display
+        cellsize: size of each square
+        buffer: space between the edge of the window and the board
+        drawn: the piece and highlight colour last drawn on each (file, rank)
+        highlights: position and colour of each named highlight, like the hovered square
+        buttons: whether each button, by its top edge, was last drawn lit
+        dirty: rectangles drawn this frame that still have to be put on the screen
+        """
+        self.display = display
+        self.cellsize = cellsize
+        self.buffer = buffer
+        self.drawn = {}
+        self.highlights = {}
+        self.buttons = {}
+        self.dirty = []
+
+
+    def reset(self):
+        """Forgets what was drawn, for when the whole window was drawn over"""
+        self.drawn.clear()
+        self.highlights.clear()
+        self.buttons.clear()
+        self.dirty = []
+
+
+    def position(self, xposition, yposition):
+        """Returns the (file, rank) under the screen coordinates, None off the board"""
+        file = (xposition - self.buffer) // self.cellsize
+        rank = (yposition - self.buffer) // self.cellsize
+        if xposition < self.buffer or yposition < self.buffer or file > 7 or rank > 7:
+            return None
+        return int(file), int(rank)
+
+
+    def colour(self, position):
+        """Returns the highlight colour of the square, None if it is not highlighted"""
+        for lit, colour in self.highlights.values():
+            if lit == position:
+                return colour
+        return None
+
+
+    def draw_square(self, state, position):
+        """Draws the square and its piece if either changed since it was last drawn"""
+        square = state.squares[position]
+        piece = square.piece
+        colour = self.colour(position)
+        look = (None if piece is None else piece.colour + piece.piece, colour)
+        if self.drawn.get(position) == look:
+            return
+        self.drawn[position] = look
+        rect = pygame.Rect(self.cellsize*position[0]+self.buffer, self.cellsize*position[1]+self.buffer,
+                           self.cellsize, self.cellsize)
+        pygame.draw.rect(self.display, colour or square.sqrcolour, rect)
+        if piece is not None:
+            self.display.blit(sprite(piece), rect)
+        self.dirty.append(rect)
+
+
+    def draw_board(self, state):
+        """Draws every square that changed, after the position changed by more than one move"""
+        for position in state.squares:
+            self.draw_square(state, position)
+
+
+    def draw_move(self, state, move):
+        """Draws the squares a move changed: origin, target, castle rook and en passant victim"""
+        start = move & 63
+        end = (move >> 6) & 63
+        flag = (move >> 12) & 15
+        changed = [(start & 7, start >> 3), (end & 7, end >> 3)]
+        if flag == CASTLE:
+            if end & 7 == 2:
+                changed += [(0, end >> 3), (3, end >> 3)]
+            else:
+                changed += [(7, end >> 3), (5, end >> 3)]
+        elif flag == ENPASSANT:
+            changed.append((end & 7, start >> 3))
+        for position in changed:
+            self.draw_square(state, position)
+
+
+    def highlight(self, state, name, position, colour=None):
+        """Moves the named highlight to position, None takes it off the board"""
+        old = self.highlights.get(name)
+        new = None if position is None else (position, colour)
+        if old == new:
+            return
+        if new is None:
+            del self.highlights[name]
+        else:
+            self.highlights[name] = new
+        if old is not None:
+            self.draw_square(state, old[0])
+        if new is not None:
+            self.draw_square(state, position)
+
+
+    def button(self, text, buttonx, buttony, lit, colour):
+        """Draws a button when it changes between lit and unlit"""
+        if self.buttons.get(buttony) == lit:
+            return
+        self.buttons[buttony] = lit
+        rect = pygame.Rect(buttonx, buttony, 175, 60)
+        pygame.draw.rect(self.display, colour, rect)
+        self.display.blit(text[0], text[1])
+        self.dirty.append(rect)
+
+
+    def update(self):
+        """Puts the rectangles drawn this frame on the screen"""
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
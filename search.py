@@ -0,0 +1,284 @@
+"""
+This file contains the search.
+
+Search picks a move with negamax alpha-beta inside iterative deepening: depth 1, 2, 3 ...
+until the depth, time or node limit runs out. Results are shared through the
+transposition table, and every finished iteration is reported with its nodes and speed
+"""
+import argparse
+import threading
+import time
+from evaluate import evaluate
+from ordering import MoveOrderer, MAX_PLY
+from see import see_ge
+from moves import QUIET, CAPTURE, ENPASSANT, QUEEN, move_name
+from fen import from_fen, POSITIONS
+from tt import TranspositionTable, EXACT, LOWER, UPPER
+
+INFINITY = 32000
+MATE = 30000
+# mate scores are at least this far from zero
+MATE_BOUND = MATE - MAX_PLY
+# how often the clock and the cancel flag are read, in nodes
+CHECK_EVERY = 1024
+
+def score_to_table(score, ply):
+    """Mate scores are stored as distance from the stored position instead of from the root"""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """Turns a stored mate score back into distance from the root"""
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class Search:
+    """
+    Search class finds the best move of a state
+    """
+    def __init__(self, table=None, megabytes=16, report=None):
+        """
+        Init method instantiates the search
+        Attributes:
+        table: transposition table, kept between searches
+        orderer: move ordering, keeps killers and history between iterations
+        report: called with the info of every finished iteration
+        nodes: nodes visited by the current search
+        qnodes: nodes of the quiescence search, included in nodes
+        pruned: captures skipped by the quiescence search as losing material
+        pv: principal variation found below each ply
+        buffers: one move list per ply, refilled by every node at that ply
+        iterations: info of every finished iteration of the last search
+        stopped: set when a limit runs out, the search then unwinds
+        cancel: set from another thread to stop the search, it stays set until cleared
+        """
+        self.table = table if table is not None else TranspositionTable(megabytes)
+        self.report = report
+        self.orderer = MoveOrderer()
+        self.nodes = 0
+        self.qnodes = 0
+        self.pruned = 0
+        self.pv = [[] for _ in range(MAX_PLY + 1)]
+        self.buffers = [[] for _ in range(MAX_PLY + 1)]
+        self.iterations = []
+        self.stopped = False
+        self.cancel = threading.Event()
+        self.start = 0
+        self.deadline = None
+        self.node_limit = None
+
+
+    def search(self, state, depth=MAX_PLY, movetime=None, nodes=None):
+        """
+        Searches the state with iterative deepening
+        depth: deepest iteration, movetime: seconds, nodes: node budget
+        Returns the best move and its score, the move is None if there are no legal moves
+        """
+        self.start = time.perf_counter()
+        self.deadline = self.start + movetime if movetime else None
+        self.node_limit = nodes
+        self.nodes = 0
+        self.qnodes = 0
+        self.pruned = 0
+        self.stopped = False
+        self.iterations = []
+        self.table.new_search()
+        self.orderer.new_search()
+
+        moves = state.generate_legal()
+        if not moves:
+            return None, 0
+        best_move = moves[0]
+        best_score = 0
+        for current in range(1, min(depth, MAX_PLY) + 1):
+            score = self.negamax(state, current, -INFINITY, INFINITY, 0)
+            # an unfinished iteration is thrown away
+            if self.stopped:
+                break
+            if self.pv[0]:
+                best_move = self.pv[0][0]
+            best_score = score
+            elapsed = time.perf_counter() - self.start
+            info = {
+                'depth': current,
+                'score': score,
+                'nodes': self.nodes,
+                'time': elapsed,
+                'nps': int(self.nodes / elapsed) if elapsed > 0 else 0,
+                'pv': list(self.pv[0]),
+            }
+            self.iterations.append(info)
+            if self.report is not None:
+                self.report(info)
+            # no point searching deeper once a mate is found
+            if abs(score) > MATE_BOUND:
+                break
+            if self.cancel.is_set() or (self.deadline is not None and time.perf_counter() >= self.deadline):
+                break
+        return best_move, best_score
+
+
+    def out_of_limits(self):
+        """Checks the node and time limits and whether the search was cancelled every few nodes"""
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+        elif self.nodes % CHECK_EVERY == 0 and (self.cancel.is_set() or (
+                self.deadline is not None and time.perf_counter() >= self.deadline)):
+            self.stopped = True
+        return self.stopped
+
+
+    def negamax(self, state, depth, alpha, beta, ply):
+        """Returns the score of the state for the side to move, searched to depth"""
+        self.nodes += 1
+        self.pv[ply] = []
+        if self.out_of_limits():
+            return 0
+        # a repeated position or fifty moves without progress is a draw
+        if ply > 0 and (state.halfmove >= 100 or state.repetitions() >= 1):
+            return 0
+
+        alpha_start = alpha
+        hash_move = None
+        entry = self.table.probe(state.key)
+        if entry is not None:
+            table_depth, table_score, bound, table_move = entry
+            if table_move:
+                hash_move = table_move
+            if ply > 0 and table_depth >= depth:
+                table_score = score_from_table(table_score, ply)
+                if bound == EXACT:
+                    return table_score
+                if bound == LOWER and table_score >= beta:
+                    return table_score
+                if bound == UPPER and table_score <= alpha:
+                    return table_score
+
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(state, alpha, beta, ply)
+
+        moves = state.generate_legal(moves=self.buffers[ply])
+        if not moves:
+            # checkmate or stalemate
+            if state.check(state.turn):
+                return -MATE + ply
+            return 0
+        self.orderer.order(state, moves, ply, hash_move)
+
+        best_score = -INFINITY
+        best_move = None
+        for searched, move in enumerate(moves):
+            undo = state.make_move(move)
+            score = -self.negamax(state, depth-1, -beta, -alpha, ply+1)
+            state.unmake_move(undo)
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [move] + self.pv[ply+1]
+                    if alpha >= beta:
+                        self.orderer.cutoff(move, ply, depth, searched)
+                        break
+
+        if best_score >= beta:
+            bound = LOWER
+        elif best_score > alpha_start:
+            bound = EXACT
+        else:
+            bound = UPPER
+        self.table.store(state.key, depth, score_to_table(best_score, ply), bound, best_move)
+        return best_score
+
+
+    def quiescence(self, state, alpha, beta, ply):
+        """
+        Searches captures only until the position is quiet, so the evaluation is never taken
+        in the middle of an exchange. Captures that lose material are not searched.
+        A side in check has to answer it, so all of its moves are searched
+        """
+        if ply >= MAX_PLY:
+            return evaluate(state)
+        in_check = state.check(state.turn)
+        moves = state.generate_legal(moves=self.buffers[ply])
+        if in_check:
+            best_score = -MATE + ply
+        else:
+            # the side to move may stand pat instead of capturing
+            best_score = evaluate(state)
+            if best_score >= beta:
+                return best_score
+            alpha = max(alpha, best_score)
+            # captures and promotions to a queen
+            moves[:] = [move for move in moves if (move >> 12) & 15 in (CAPTURE, ENPASSANT) or move >> 16 == QUEEN]
+
+        for move in self.orderer.order(state, moves, ply):
+            # promotions without a capture have nothing to exchange
+            if not in_check and (move >> 12) & 15 != QUIET and not see_ge(state, move):
+                self.pruned += 1
+                continue
+            self.nodes += 1
+            self.qnodes += 1
+            if self.out_of_limits():
+                return 0
+            undo = state.make_move(move)
+            score = -self.quiescence(state, -beta, -alpha, ply+1)
+            state.unmake_move(undo)
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+
+def print_info(info):
+    """Prints the info of a finished iteration"""
+    print('depth %2d score %6d nodes %9d time %7.2fs nps %7d pv %s'
+          % (info['depth'], info['score'], info['nodes'], info['time'], info['nps'],
+             ' '.join(move_name(move) for move in info['pv'])))
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Search a position')
+    parser.add_argument('-d', '--depth', type=int, default=MAX_PLY, help='deepest iteration')
+    parser.add_argument('-t', '--movetime', type=float, help='seconds to search')
+    parser.add_argument('-n', '--nodes', type=int, help='node budget')
+    parser.add_argument('--fen', help='position to search')
+    parser.add_argument('--position', choices=sorted(POSITIONS), default='startpos',
+                        help='reference position to search when no FEN is given')
+    parser.add_argument('--hash', type=int, default=16, help='transposition table size in megabytes')
+    args = parser.parse_args()
+    if args.depth == MAX_PLY and args.movetime is None and args.nodes is None:
+        args.movetime = 5.0
+
+    state = from_fen(args.fen if args.fen else POSITIONS[args.position][0])
+    search = Search(megabytes=args.hash, report=print_info)
+    move, score = search.search(state, args.depth, args.movetime, args.nodes)
+    if move is None:
+        print('no legal moves')
+    else:
+        print('bestmove', move_name(move), 'score', score)
+    stats = search.orderer.stats()
+    print('quiescence nodes %d, losing captures pruned %d' % (search.qnodes, search.pruned))
+    print('cutoffs %d, first move %d (%.1f%%)'
+          % (stats['cutoffs'], stats['first_cutoffs'], 100 * stats['first_cutoff_rate']))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+"""
+This file contains the static exchange evaluation.
+
+The exchange on the target square of a capture is played out without moving any pieces:
+both sides keep recapturing with their least valuable attacker and may stop whenever
+going on would lose material. Attackers come from State.attackers_of, cast from the target
+square on an occupancy that drops each piece once it has captured, so pieces
+lined up behind it (x-rays) join the exchange
+"""
+from board10x12 import MAILBOX
+from moves import ENPASSANT
+
+SEE_VALUES = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 20000}
+
+
+def least_valuable(state, bits):
+    """Returns the square and value of the least valuable piece in bits"""
+    best = None
+    best_value = 0
+    while bits:
+        low = bits & -bits
+        bits ^= low
+        square = low.bit_length() - 1
+        value = SEE_VALUES[state.board[MAILBOX[square]].piece]
+        if best is None or value < best_value:
+            best = square
+            best_value = value
+    return best, best_value
+
+
+def see(state, move):
+    """
+    Returns the material the side to move wins with a capture, in centipawns, when both
+    sides go on recapturing on the target square for as long as it pays
+    """
+    start = move & 63
+    target = (move >> 6) & 63
+    occupied = state.occupied ^ (1 << start)
+    if (move >> 12) & 15 == ENPASSANT:
+        # the pawn taken en passant is beside the target square
+        occupied ^= 1 << ((start & ~7) | (target & 7))
+        gains = [SEE_VALUES['P']]
+    else:
+        gains = [SEE_VALUES[state.board[MAILBOX[target]].piece]]
+    value = SEE_VALUES[state.board[MAILBOX[start]].piece]
+    side = 'b' if state.turn == 'w' else 'w'
+
+    while True:
+        bits = state.attackers_of(target, occupied) & state.occupancy[side]
+        if not bits:
+            break
+        square, next_value = least_valuable(state, bits)
+        # the side to recapture takes the piece that captured last
+        gains.append(value - gains[-1])
+        value = next_value
+        occupied ^= 1 << square
+        side = 'b' if side == 'w' else 'w'
+
+    # each side may stand pat instead of recapturing
+    for index in range(len(gains)-1, 0, -1):
+        gains[index-1] = -max(-gains[index-1], gains[index])
+    return gains[0]
+
+
+def see_ge(state, move, threshold=0):
+    """
+    Returns whether see(state, move) >= threshold
+    The exchange is only followed until the side to recapture can no longer move the result
+    to the other side of the threshold, which is all quiescence needs to know
+    """
+    start = move & 63
+    target = (move >> 6) & 63
+    occupied = state.occupied ^ (1 << start)
+    if (move >> 12) & 15 == ENPASSANT:
+        occupied ^= 1 << ((start & ~7) | (target & 7))
+        balance = SEE_VALUES['P'] - threshold
+    else:
+        balance = SEE_VALUES[state.board[MAILBOX[target]].piece] - threshold
+    # below the threshold even if the capturing piece is never taken back
+    if balance < 0:
+        return False
+    balance = SEE_VALUES[state.board[MAILBOX[start]].piece] - balance
+    # still at the threshold after losing the capturing piece
+    if balance <= 0:
+        return True
+
+    # whether the side to move reaches the threshold if the exchange stops here
+    result = True
+    side = 'b' if state.turn == 'w' else 'w'
+    while True:
+        bits = state.attackers_of(target, occupied) & state.occupancy[side]
+        if not bits:
+            break
+        result = not result
+        square, value = least_valuable(state, bits)
+        # balance is what the side that just recaptured has over the threshold if its piece
+        # is taken back, when that is still enough the other side cannot change the result
+        balance = value - balance
+        if balance < result:
+            break
+        occupied ^= 1 << square
+        side = 'b' if side == 'w' else 'w'
+    return result
+
+
+# positions, capture and the exchange result with SEE_VALUES, worked out by hand
+POSITIONS = (
+    ('4k3/8/8/3p4/4P3/8/8/4K3 w - - 0 1', 'e4d5', 100),
+    ('4k3/8/2p5/3p4/4P3/8/8/4K3 w - - 0 1', 'e4d5', 0),
+    ('4k3/8/2p5/3p4/8/8/3Q4/4K3 w - - 0 1', 'd2d5', -800),
+    ('4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1', 'e5d6', 100),
+    ('4k3/3r4/3r4/3p4/8/8/3R4/3RK3 w - - 0 1', 'd2d5', -400),
+    ('1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1', 'e1e5', 100),
+    ('1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1', 'd3e5', -220),
+    ('4k3/8/5r2/8/3n4/8/4N3/4K3 w - - 0 1', 'e2d4', 320),
+    ('4k3/8/4p3/3n4/8/4N3/8/4K3 w - - 0 1', 'e3d5', 0),
+    ('4k3/5q2/8/3n4/8/1B6/8/4K3 w - - 0 1', 'b3d5', -10),
+)
+THRESHOLDS = (-500, -100, 0, 1, 100, 500)
+
+
+def check(games=20, plies=80, seed=1):
+    """
+    Compares see and see_ge against the known results, then see_ge against see on every
+    capture of a few random games. Returns True when they all agree
+    """
+    import random
+    from fen import from_fen
+    from moves import move_name, CAPTURE
+
+    passed = True
+    for fen, name, expected in POSITIONS:
+        state = from_fen(fen)
+        move = next(move for move in state.generate_legal() if move_name(move) == name)
+        result = see(state, move)
+        good = result == expected and see_ge(state, move, expected) and not see_ge(state, move, expected+1)
+        passed = passed and good
+        print('%-60s %s %6d (expected %d) %s' % (fen, name, result, expected, 'ok' if good else 'FAIL'))
+
+    rng = random.Random(seed)
+    captures = 0
+    mismatches = 0
+    for _ in range(games):
+        state = from_fen()
+        for _ in range(plies):
+            moves = state.generate_legal()
+            if not moves:
+                break
+            for move in moves:
+                if (move >> 12) & 15 in (CAPTURE, ENPASSANT):
+                    captures += 1
+                    value = see(state, move)
+                    if any(see_ge(state, move, threshold) != (value >= threshold) for threshold in THRESHOLDS):
+                        mismatches += 1
+            state.make_move(rng.choice(moves))
+    print('random captures %d, see_ge differs from see on %d %s'
+          % (captures, mismatches, 'ok' if not mismatches else 'FAIL'))
+    return passed and not mismatches
+
+
+if __name__ == '__main__':
+    raise SystemExit(0 if check() else 1)
@@ -0,0 +1,35 @@
+"""
+This file contains the sprite cache.
+
+Each piece image is loaded from disk the first time it is drawn and kept as a surface
+converted to the display format, every later draw blits the surface from memory
+"""
+import pygame
+from pieces import IMAGES
+
+# surface of each piece by colour and letter
+SPRITES = {'w': {}, 'b': {}}
+
+
+def load(path):
+    """Loads an image, converted for fast blitting once the display is set up"""
+    image = pygame.image.load(path)
+    if pygame.display.get_surface() is not None:
+        return image.convert_alpha()
+    return image
+
+
+def sprite(piece):
+    """Returns the surface of the piece"""
+    sprites = SPRITES[piece.colour]
+    image = sprites.get(piece.piece)
+    if image is None:
+        image = sprites[piece.piece] = load(IMAGES[piece.colour][piece.piece])
+    return image
+
+
+def preload():
+    """Loads every piece image, so no drawing during the game reads from disk"""
+    for colour, images in IMAGES.items():
+        for letter, path in images.items():
+            SPRITES[colour][letter] = load(path)
@@ -0,0 +1,151 @@
+"""
+This file contains the transposition table.
+
+The table stores search results by zobrist key so a position reached again through a
+different move order does not have to be searched twice. Entries live in two flat arrays
+of 64 bit integers (keys and packed data) instead of Python objects, 16 bytes per entry
+"""
+from array import array
+
+# bound types
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+# packed data layout: move 24 bits, score 16 bits, depth 8 bits, bound 2 bits, age 6 bits
+SCORE_SHIFT = 24
+DEPTH_SHIFT = 40
+BOUND_SHIFT = 48
+AGE_SHIFT = 50
+SCORE_OFFSET = 1 << 15
+MAX_SCORE = SCORE_OFFSET - 1
+MAX_DEPTH = 255
+AGES = 64
+
+ENTRY_BYTES = 16
+# slot 0 of a bucket keeps the deepest result, slot 1 is always replaced
+BUCKET_SLOTS = 2
+
+
+class TranspositionTable:
+    """
+    TranspositionTable class holds search results in a fixed amount of memory
+    """
+    def __init__(self, megabytes=16):
+        """
+        Init method allocates the table
+        Attributes:
+        size: number of buckets, a power of two
+        keys: zobrist key of each slot
+        data: packed move, score, depth, bound and age of each slot
+        age: current search, entries of older searches are replaced first
+        probes, hits, collisions, stores, overwrites: statistics
+        """
+        buckets = max(1, (megabytes << 20) // (ENTRY_BYTES * BUCKET_SLOTS))
+        self.size = 1 << (buckets.bit_length() - 1)
+        self.mask = self.size - 1
+        self.keys = array('Q', [0]) * (self.size * BUCKET_SLOTS)
+        self.data = array('Q', [0]) * (self.size * BUCKET_SLOTS)
+        self.age = 0
+        self.reset_stats()
+
+
+    def reset_stats(self):
+        """Sets all statistics back to zero"""
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+
+    def clear(self):
+        """Empties the table"""
+        for index in range(len(self.keys)):
+            self.keys[index] = 0
+            self.data[index] = 0
+        self.age = 0
+        self.reset_stats()
+
+
+    def new_search(self):
+        """Ages the table so entries from earlier searches give way to new ones"""
+        self.age = (self.age + 1) % AGES
+
+
+    def probe(self, key):
+        """
+        Looks up a position
+        Returns (depth, score, bound, move), or None if the position is not stored
+        """
+        self.probes += 1
+        slot = (key & self.mask) * BUCKET_SLOTS
+        keys = self.keys
+        for index in (slot, slot+1):
+            if keys[index] == key:
+                data = self.data[index]
+                if data:
+                    self.hits += 1
+                    return ((data >> DEPTH_SHIFT) & 0xff,
+                            ((data >> SCORE_SHIFT) & 0xffff) - SCORE_OFFSET,
+                            (data >> BOUND_SHIFT) & 3,
+                            data & 0xffffff)
+        # the bucket holds other positions
+        if self.data[slot] or self.data[slot+1]:
+            self.collisions += 1
+        return None
+
+
+    def store(self, key, depth, score, bound, move=0):
+        """
+        Stores a search result
+        The depth preferred slot takes it if it holds the same position, an older search,
+        or a shallower result. Otherwise it goes into the always replace slot
+        """
+        self.stores += 1
+        slot = (key & self.mask) * BUCKET_SLOTS
+        old = self.data[slot]
+        if (self.keys[slot] != key and old and (old >> AGE_SHIFT) == self.age and
+                depth < (old >> DEPTH_SHIFT) & 0xff):
+            slot += 1
+            old = self.data[slot]
+        if self.keys[slot] == key:
+            # keep the best move of an earlier search of this position
+            if not move:
+                move = old & 0xffffff
+        elif old:
+            self.overwrites += 1
+        score = max(-MAX_SCORE, min(MAX_SCORE, score))
+        self.keys[slot] = key
+        self.data[slot] = (move | ((score + SCORE_OFFSET) << SCORE_SHIFT) | (min(depth, MAX_DEPTH) << DEPTH_SHIFT) |
+                           (bound << BOUND_SHIFT) | (self.age << AGE_SHIFT))
+
+
+    def hashfull(self):
+        """Returns how many of the first thousand slots hold an entry of the current search, per thousand"""
+        sample = min(1000, len(self.data))
+        used = 0
+        for index in range(sample):
+            data = self.data[index]
+            if data and (data >> AGE_SHIFT) == self.age:
+                used += 1
+        return used * 1000 // sample
+
+
+    def stats(self):
+        """Returns the statistics with hit, collision and overwrite rates"""
+        probes = max(self.probes, 1)
+        stores = max(self.stores, 1)
+        return {
+            'megabytes': (len(self.keys) * ENTRY_BYTES) >> 20,
+            'entries': len(self.keys),
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hits / probes,
+            'collisions': self.collisions,
+            'collision_rate': self.collisions / probes,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'overwrite_rate': self.overwrites / stores,
+            'hashfull': self.hashfull(),
+        }
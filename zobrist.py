@@ -0,0 +1,66 @@
+"""
+This file contains the zobrist keys.
+
+A position is identified by a 64 bit key: the XOR of a random number for every piece
+on its square, the side to move, the castling rights and the en passant file.
+A move only changes a few of these, so State updates its key with a few XORs per move
+"""
+import random
+from board10x12 import MAILBOX
+from attacks import WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE
+
+# fixed seed so a position has the same key in every run
+_RANDOM = random.Random(20190101)
+
+# PIECE_KEYS[colour][piece][rank*8 + file]
+PIECE_KEYS = {}
+for _colour in ('w', 'b'):
+    PIECE_KEYS[_colour] = {}
+    for _piece in 'PNBRQK':
+        PIECE_KEYS[_colour][_piece] = [_RANDOM.getrandbits(64) for _ in range(64)]
+
+# XOR-ed in when black is to move
+SIDE_KEY = _RANDOM.getrandbits(64)
+
+# one key per right, combined for each of the 16 sets of rights
+_RIGHT_KEYS = [_RANDOM.getrandbits(64) for _ in range(4)]
+CASTLE_KEYS = []
+for _rights in range(16):
+    _key = 0
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            _key ^= _RIGHT_KEYS[_bit]
+    CASTLE_KEYS.append(_key)
+
+# indexed by the file of the pawn that can be captured en passant
+EP_KEYS = [_RANDOM.getrandbits(64) for _ in range(8)]
+
+
+def castling_rights(state):
+    """Returns the castling rights of a state, read from the first_move flags of kings and rooks"""
+    rights = 0
+    board = state.board
+    for right, king, rook in ((WHITE_KING_SIDE, 60, 63), (WHITE_QUEEN_SIDE, 60, 56),
+                              (BLACK_KING_SIDE, 4, 7), (BLACK_QUEEN_SIDE, 4, 0)):
+        kpiece = board[MAILBOX[king]]
+        rpiece = board[MAILBOX[rook]]
+        if (kpiece is not None and kpiece.piece == 'K' and kpiece.first_move and
+                rpiece is not None and rpiece.piece == 'R' and rpiece.first_move and rpiece.colour == kpiece.colour):
+            rights |= right
+    return rights
+
+
+def compute(state):
+    """Computes the key of a state from scratch"""
+    key = 0
+    board = state.board
+    for square in range(64):
+        piece = board[MAILBOX[square]]
+        if piece is not None:
+            key ^= PIECE_KEYS[piece.colour][piece.piece][square]
+    if state.turn == 'b':
+        key ^= SIDE_KEY
+    key ^= CASTLE_KEYS[castling_rights(state)]
+    if state.enpassant and state.last_move:
+        key ^= EP_KEYS[state.last_move[1].position[0]]
+    return key